@@ -0,0 +1,50 @@
+"""
+Measures how many received lines per second each JSON decoder can turn into events and button lists.
+
+Run from the repository root with: PYTHONPATH=. python benchmarks/bench_decoder.py
+"""
+import asyncio
+import json
+import time
+
+from pyflichub.client import FlicHubTcpClient
+from pyflichub.decoder import available_decoders
+
+EVENT_LINE = b'{"event": "button", "button": "90:88:a9:5b:12:89", "action": "single", "button_number": 0}\n'
+BUTTON = {
+    "bdaddr": "90:88:a9:5b:12:89",
+    "serialNumber": "BC12-C12345",
+    "color": "black",
+    "name": "Living room",
+    "activeDisconnect": False,
+    "connected": True,
+    "ready": True,
+    "batteryStatus": 100,
+    "uuid": "e5e1c1b1a2b3c4d5e6f7a8b9c0d1e2f3",
+    "flicVersion": 2,
+    "firmwareVersion": 11,
+    "key": "0123456789abcdef0123456789abcdef",
+    "passiveMode": False,
+    "batteryTimestamp": 1700000000000,
+    "bootId": "1234",
+}
+BUTTONS_LINE = json.dumps({"command": "buttons", "data": [BUTTON] * 50}).encode() + b"\n"
+
+
+def bench(decoder: str, line: bytes, count: int) -> float:
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.new_event_loop(), json_decoder=decoder)
+    start = time.perf_counter()
+    for _ in range(count):
+        client.data_received(line)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    for decoder in available_decoders():
+        events = bench(decoder, EVENT_LINE, 100_000)
+        buttons = bench(decoder, BUTTONS_LINE, 2_000)
+        print(f"{decoder:>8}: {events:>10,.0f} event lines/s  {buttons:>8,.0f} button list lines/s (50 buttons)")
+
+
+if __name__ == "__main__":
+    main()
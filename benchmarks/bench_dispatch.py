@@ -0,0 +1,136 @@
+"""
+Compares the table-driven event dispatch of the client with the if/elif chain it replaced.
+
+Run from the repository root with: PYTHONPATH=. python benchmarks/bench_dispatch.py
+"""
+import asyncio
+import time
+
+from pyflichub.button import FlicButton
+from pyflichub.client import FlicHubTcpClient, _LOGGER
+from pyflichub.event import Event
+from pyflichub.server_command import ServerCommand
+
+BDADDR = "90:88:a9:5b:12:89"
+EVENTS = [
+    Event("button", button=BDADDR, action="down"),
+    Event("button", button=BDADDR, action="up"),
+    Event("button", button=BDADDR, action="single"),
+    Event("buttonReady", button=BDADDR),
+    Event("actionMessage", action="message"),
+    Event("irResult", action="success"),
+    Event("virtualDeviceUpdate", meta_data={"virtual_device_id": "light", "button_id": BDADDR}),
+]
+
+
+def legacy_handle_event(self: FlicHubTcpClient, event: Event):
+    """The if/elif chain _handle_event used before, unchanged."""
+    self.metrics.inc("events_received_total", labels=self._labels("event", event.event))
+    for subscription in self._subscriptions:
+        subscription.put(event)
+
+    button = None
+    if event.event == "button":
+        button = self._get_button(event.button)
+        if button:
+            _LOGGER.debug(f"Button {button.name} was {event.action}")
+
+    elif event.event == "buttonAdded":
+        self.cache.invalidate(ServerCommand.BUTTONS)
+        button = self._get_button(event.button)
+        if not button:
+            _LOGGER.debug(f"Button {event.button} added, fetching details")
+            self._loop.create_task(self.get_button_details(event.button))
+
+    elif event.event == "buttonDeleted":
+        self.cache.invalidate(ServerCommand.BUTTONS)
+        button = self._get_button(event.button)
+        if button:
+            _LOGGER.debug(f"Button {button.name} deleted")
+            self._button_store.remove(button)
+
+    elif event.event == "buttonConnected":
+        self.cache.invalidate(ServerCommand.BUTTONS)
+        button = self._get_button(event.button)
+        if button:
+            button.connected = True
+            _LOGGER.debug(f"Button {button.name} is connected")
+
+    elif event.event == "buttonDisconnected":
+        self.cache.invalidate(ServerCommand.BUTTONS)
+        button = self._get_button(event.button)
+        if button:
+            button.connected = False
+            _LOGGER.debug(f"Button {button.name} is disconnected")
+
+    elif event.event == "buttonReady":
+        button = self._get_button(event.button)
+        if button:
+            button.ready = True
+            _LOGGER.debug(f"Button {button.name} is ready")
+
+    elif event.event == "actionMessage":
+        _LOGGER.debug(f"Action message received: {event.action}")
+
+    elif event.event == "virtualDeviceUpdate":
+        if event.meta_data and "virtual_device_id" in event.meta_data:
+            _LOGGER.debug(f"Virtual device update received: {event.meta_data['virtual_device_id']}")
+        if event.meta_data and "button_id" in event.meta_data:
+            button = self._get_button(event.meta_data["button_id"])
+
+    if self._event_callback is not None:
+        if event.event in [
+            "actionMessage",
+            "virtualDeviceUpdate",
+            "buttonAdded",
+            "buttonDeleted",
+            "buttonConnected",
+            "buttonDisconnected",
+            "buttonReady",
+            "irResult",
+        ]:
+            self._dispatch_event(button, event)
+            return
+        elif button is not None:
+            self._dispatch_event(button, event)
+            return
+
+    if event.trace is not None:
+        self.tracer.finish(event, event.trace)
+
+
+def bench(handle_event, count: int) -> float:
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.new_event_loop(), event_callback=lambda button, event: None)
+    client.buttons = [
+        FlicButton(
+            bdaddr=BDADDR,
+            serial_number="BC12-C12345",
+            color="black",
+            name="Living room",
+            active_disconnect=False,
+            connected=True,
+            ready=True,
+            battery_status=100,
+            uuid="e5e1c1b1a2b3c4d5e6f7a8b9c0d1e2f3",
+            flic_version=2,
+            firmware_version=11,
+            key="0123456789abcdef0123456789abcdef",
+            passive_mode=False,
+        )
+    ]
+    events = EVENTS * (count // len(EVENTS))
+    start = time.perf_counter()
+    for event in events:
+        handle_event(client, event)
+    return len(events) / (time.perf_counter() - start)
+
+
+def main():
+    legacy = max(bench(legacy_handle_event, 350_000) for _ in range(5))
+    table = max(bench(FlicHubTcpClient._handle_event, 350_000) for _ in range(5))
+    print(f"if/elif chain: {legacy:>12,.0f} events/s")
+    print(f"handler table: {table:>12,.0f} events/s ({table / legacy - 1:+.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Measures the memory used by and the time it takes to create the models built for every message from the hub.
+
+Run from the repository root with: PYTHONPATH=. python benchmarks/bench_models.py
+"""
+import time
+import tracemalloc
+
+from pyflichub.button import FlicButton
+from pyflichub.command import Command
+from pyflichub.event import Event
+from pyflichub.flichub import FlicHubInfo
+from pyflichub.server_info import ServerInfo
+
+BUTTON = {
+    "bdaddr": "90:88:a9:5b:12:89",
+    "serial_number": "BC12-C12345",
+    "color": "black",
+    "name": "Living room",
+    "active_disconnect": False,
+    "connected": True,
+    "ready": True,
+    "battery_status": 100,
+    "uuid": "e5e1c1b1a2b3c4d5e6f7a8b9c0d1e2f3",
+    "flic_version": 2,
+    "firmware_version": 11,
+    "key": "0123456789abcdef0123456789abcdef",
+    "passive_mode": False,
+}
+HUB_INFO = {
+    "dhcp": {"wifi": {"connected": True, "ip": "192.168.1.2", "mac": "aa:bb:cc:dd:ee:ff"}},
+    "wifi_state": {"state": "connected", "ssid": [104, 111, 109, 101]},
+}
+MODELS = {
+    "Event": lambda: Event(event="button", button="90:88:a9:5b:12:89", action="single", button_number=0),
+    "Command": lambda: Command(command="server", data=None, request_id=1),
+    "ServerInfo": lambda: ServerInfo(version="0.1.13"),
+    "FlicButton": lambda: FlicButton(**BUTTON),
+    "FlicHubInfo": lambda: FlicHubInfo(**HUB_INFO),
+}
+
+
+def allocated_bytes(create, count: int = 10_000) -> float:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    instances = [create() for _ in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    # Leave out the list holding the instances
+    return (size - len(instances) * 8) / count
+
+
+def construction_time(create, count: int = 200_000) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        create()
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    for name, create in MODELS.items():
+        size = allocated_bytes(create)
+        duration = min(construction_time(create) for _ in range(3))
+        print(f"{name:>12}: {size:>7.0f} bytes  {duration * 1e9:>7.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Compares the cost of RateDetentController.update_raw with update_raw_fast, per call and in allocated memory.
+
+Run from the repository root with: PYTHONPATH=. python benchmarks/bench_twist_controller.py
+"""
+import random
+import time
+import tracemalloc
+
+from pyflichub.twist_controller import RateDetentController
+
+COUNT = 200_000
+
+
+def positions(count: int) -> list[tuple[float, float]]:
+    rng = random.Random(1)
+    samples = []
+    now = 0.0
+    position = 50.0
+    for _ in range(count):
+        now += 20
+        position = min(100.0, max(0.0, position + rng.uniform(-8, 8)))
+        samples.append((now, position))
+    return samples
+
+
+def per_call(method: str, samples) -> float:
+    controller = RateDetentController()
+    controller.stop()
+    update = getattr(controller, method)
+    start = time.perf_counter()
+    for now, raw in samples:
+        update(raw, now)
+    return (time.perf_counter() - start) / len(samples)
+
+
+def allocated_per_call(method: str, samples) -> float:
+    controller = RateDetentController()
+    controller.stop()
+    update = getattr(controller, method)
+    results = []
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for now, raw in samples:
+        # Keep the results alive so their memory is counted
+        results.append(update(raw, now))
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return (allocated - len(results) * 8) / len(samples)
+
+
+def main():
+    samples = positions(COUNT)
+    for method in ("update_raw", "update_raw_fast"):
+        duration = min(per_call(method, samples) for _ in range(3))
+        allocated = allocated_per_call(method, samples[:20_000])
+        print(f"{method:>15}: {duration * 1e9:>6.0f} ns per call, {allocated:>6.1f} bytes retained per call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Measures how fast a recorded Twist trace can be replayed, comparing replay with feeding update_raw and ticking.
+
+Run from the repository root with: PYTHONPATH=. python benchmarks/bench_twist_replay.py
+"""
+import random
+import time
+
+from pyflichub.twist_controller import RateDetentController
+from pyflichub.twist_replay import np, replay
+
+# One hour of a Twist reporting every 50 ms while turned, and resting in between
+HOURS = 1
+
+
+def recorded_trace(hours: float):
+    rng = random.Random(1)
+    samples = []
+    now = 0.0
+    position = 50.0
+    while now < hours * 3_600_000:
+        if rng.random() < 0.01:
+            now += rng.uniform(1_000, 60_000)
+        now += 50
+        position = min(100.0, max(0.0, position + rng.uniform(-8, 8)))
+        samples.append((now, position))
+    return samples
+
+
+def stream(cfg, samples):
+    controller = RateDetentController(cfg)
+    controller.stop()
+    first = samples[0][0]
+    ticks = 0
+    results = []
+    for now, raw in samples:
+        while first + (ticks + 1) * controller.tick_ms <= now:
+            ticks += 1
+            controller._tick(first + ticks * controller.tick_ms)
+        results.append((controller.update_raw(raw, now_ms=now), controller.get_actual_out_pct()))
+    return results
+
+
+def main():
+    samples = recorded_trace(HOURS)
+    configs = [{"tier1MaxOff": tier1, "easeConfirmMs": ease} for tier1 in (15, 25, 35) for ease in (100, 200, 400)]
+    print(f"{len(samples):,} samples, {len(configs)} configs, NumPy {'on' if np is not None else 'off'}")
+
+    for name, run in [
+        ("update_raw + ticks", lambda cfg: stream(cfg, samples)),
+        ("replay", lambda cfg: replay(RateDetentController(cfg), samples)),
+    ]:
+        duration = min(timed(run, configs) for _ in range(3))
+        print(f"{name:>18}: {duration:.2f} s, {duration / len(configs) / HOURS:.3f} s per config and hour of trace")
+
+
+def timed(run, configs) -> float:
+    start = time.perf_counter()
+    for cfg in configs:
+        run(cfg)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+from typing import Iterable, Iterator, Optional
+
+from pyflichub.button import FlicButton
+
+
+class ButtonStore:
+    """
+    The buttons known by one client, indexed by bluetooth address, uuid and serial number.
+    The buttons are kept in one dict keyed by bluetooth address. as_list returns a new list on each call, so
+    callers can change it without the store getting out of step with its index.
+    """
+
+    __slots__ = ("_by_bdaddr", "_by_uuid", "_by_serial_number")
+
+    def __init__(self, buttons: Iterable[FlicButton] = ()):
+        self._by_bdaddr: dict[str, FlicButton] = {}
+        self._by_uuid: dict[str, FlicButton] = {}
+        self._by_serial_number: dict[str, FlicButton] = {}
+        self.replace_all(buttons)
+
+    def __len__(self) -> int:
+        return len(self._by_bdaddr)
+
+    def __iter__(self) -> Iterator[FlicButton]:
+        return iter(self._by_bdaddr.values())
+
+    def __contains__(self, bdaddr: str) -> bool:
+        return bdaddr in self._by_bdaddr
+
+    @property
+    def bdaddrs(self) -> list[str]:
+        return list(self._by_bdaddr)
+
+    def as_list(self) -> list[FlicButton]:
+        return list(self._by_bdaddr.values())
+
+    def get(self, bdaddr: str) -> Optional[FlicButton]:
+        return self._by_bdaddr.get(bdaddr)
+
+    def get_by_uuid(self, uuid: str) -> Optional[FlicButton]:
+        return self._by_uuid.get(uuid)
+
+    def get_by_serial_number(self, serial_number: str) -> Optional[FlicButton]:
+        return self._by_serial_number.get(serial_number)
+
+    def replace_all(self, buttons: Iterable[FlicButton]):
+        self._by_bdaddr = {}
+        self._by_uuid = {}
+        self._by_serial_number = {}
+        for button in buttons:
+            self.add(button)
+
+    def add(self, button: FlicButton):
+        """Add a button, replacing the known button with the same bluetooth address."""
+        known = self._by_bdaddr.get(button.bdaddr)
+        if known is not None:
+            self.remove(known)
+
+        self._by_bdaddr[button.bdaddr] = button
+        if button.uuid:
+            self._by_uuid[button.uuid] = button
+        if button.serial_number:
+            self._by_serial_number[button.serial_number] = button
+
+    def remove(self, button: FlicButton):
+        self._by_bdaddr.pop(button.bdaddr, None)
+        if self._by_uuid.get(button.uuid) is button:
+            del self._by_uuid[button.uuid]
+        if self._by_serial_number.get(button.serial_number) is button:
+            del self._by_serial_number[button.serial_number]
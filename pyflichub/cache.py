@@ -0,0 +1,51 @@
+import time
+from collections import Counter
+from typing import Callable, Optional
+
+from pyflichub.command import Command
+from pyflichub.server_command import ServerCommand
+
+# Seconds a reply is reused for, 0 disables caching of that command
+DEFAULT_CACHE_TTL = {
+    ServerCommand.SERVER_INFO: 300.0,
+    ServerCommand.HUB_INFO: 60.0,
+    ServerCommand.BUTTONS: 0.0,
+}
+
+
+class CommandCache:
+    """Keeps command replies for a configurable time per command."""
+
+    def __init__(
+        self, ttl: Optional[dict[ServerCommand, float]] = None, time_func: Optional[Callable[[], float]] = None
+    ):
+        self.ttl = {**DEFAULT_CACHE_TTL, **(ttl or {})}
+        self._time = time_func or time.monotonic
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+        self._entries: dict[str, tuple[float, Command]] = {}
+
+    def get(self, cmd: ServerCommand) -> Optional[Command]:
+        if not self.ttl.get(cmd):
+            return None
+
+        entry = self._entries.get(cmd)
+        if entry is None or entry[0] <= self._time():
+            self.misses[cmd] += 1
+            return None
+
+        self.hits[cmd] += 1
+        return entry[1]
+
+    def set(self, cmd: ServerCommand, command: Command):
+        ttl = self.ttl.get(cmd)
+        if ttl:
+            self._entries[cmd] = (self._time() + ttl, command)
+
+    def invalidate(self, *cmds: ServerCommand):
+        """Drop the cached replies of the given commands, or of all commands if none are given."""
+        if not cmds:
+            self._entries.clear()
+            return
+        for cmd in cmds:
+            self._entries.pop(cmd, None)
@@ -1,25 +1,64 @@
 import asyncio
+import inspect
+import itertools
 import json
 import logging
-import time
+from collections import deque
 from datetime import datetime
 from functools import partial, wraps
-from typing import Union
+from typing import Callable
 
 import async_timeout
-import humps
 
-from pyflichub.button import FlicButton
+from pyflichub.button import ButtonsDiff, FlicButton
+from pyflichub.button_store import ButtonStore
+from pyflichub.cache import CommandCache
+from pyflichub.clock import Clock, MONOTONIC_CLOCK
 from pyflichub.command import Command
+from pyflichub.decoder import get_decoder
+from pyflichub.dispatcher import EventDispatcher, MAX_PENDING_EVENTS, OverflowPolicy
 from pyflichub.event import Event
 from pyflichub.flichub import FlicHubInfo
+from pyflichub.histogram import Histogram
+from pyflichub.keys import decamelize, decamelize_keys
+from pyflichub.metrics import Labels, MetricsCollector
+from pyflichub.offline_buffer import OfflineBuffer
+from pyflichub.reconnect import ReconnectPolicy, ReconnectStats
 from pyflichub.server_command import ServerCommand
 from pyflichub.server_info import ServerInfo
-from pyflichub.updater import check_for_updates, UPDATE_LINK
+from pyflichub.subscription import EventFilter, EventSubscription, MAX_PENDING_SUBSCRIBER_EVENTS
+from pyflichub.throttle import LatestValueThrottle
+from pyflichub.tracing import EventTrace, EventTracer
+from pyflichub.updater import check_for_updates, is_newer, UPDATE_LINK
+from pyflichub.writer import OutboundQueue
 
 _LOGGER = logging.getLogger(__name__)
 
 DATA_READY_TIMEOUT = 10.0
+HEARTBEAT_INTERVAL = 5.0
+HEARTBEAT_MAX_MISSED = 2
+MAX_LINE_LENGTH = 1024 * 1024
+
+# First version of tcpserver.js that echoes request ids in its replies
+REQUEST_ID_MIN_HUB_VERSION = "0.1.13"
+# First version of tcpserver.js that answers the button and buttonsDiff commands
+BUTTON_DETAILS_MIN_HUB_VERSION = "0.1.13"
+# First version of tcpserver.js that can stamp events with the time on the hub
+EVENT_TIMESTAMPS_MIN_HUB_VERSION = "0.1.13"
+
+# Events passed to the event callback even when they are not about a known button
+ALWAYS_DISPATCHED_EVENTS = frozenset(
+    {
+        "actionMessage",
+        "virtualDeviceUpdate",
+        "buttonAdded",
+        "buttonDeleted",
+        "buttonConnected",
+        "buttonDisconnected",
+        "buttonReady",
+        "irResult",
+    }
+)
 
 
 def wrap(func):
@@ -34,48 +73,169 @@ def wrap(func):
 
 
 class FlicHubTcpClient(asyncio.Protocol):
-    buttons: list[FlicButton] = []
     network: FlicHubInfo
 
-    def __init__(self, ip, port, loop, timeout=1.0, reconnect_timeout=10.0, event_callback=None, command_callback=None):
-        self._data_ready: dict[str : Union[asyncio.Event, None]] = {}
+    def __init__(
+        self,
+        ip,
+        port,
+        loop,
+        timeout=1.0,
+        reconnect_timeout=10.0,
+        event_callback=None,
+        command_callback=None,
+        max_line_length=MAX_LINE_LENGTH,
+        json_decoder=None,
+        cache_ttl=None,
+        write_buffer_limits=None,
+        virtual_device_max_rate=None,
+        reconnect_policy=None,
+        heartbeat_interval=HEARTBEAT_INTERVAL,
+        heartbeat_max_missed=HEARTBEAT_MAX_MISSED,
+        offline_buffer_rules=None,
+        metrics=None,
+        tracer=None,
+        dispatch_workers=None,
+        dispatch_max_pending=MAX_PENDING_EVENTS,
+        dispatch_overflow=OverflowPolicy.DROP_OLDEST,
+        clock=None,
+    ):
+        self._clock: Clock = clock or MONOTONIC_CLOCK
+        self._button_store = ButtonStore()
+        self._requests: dict[int, tuple[ServerCommand, asyncio.Future]] = {}
+        self._requests_by_command: dict[str, deque[int]] = {}
+        self._request_ids = itertools.count(1)
+        self._hub_version: str | None = None
+        self._inflight: dict[ServerCommand, asyncio.Future] = {}
+        self.cache = CommandCache(cache_ttl, self._clock.now)
         self._transport = None
+        self._write_buffer_limits = write_buffer_limits
+        self.write_queue = OutboundQueue(loop, lambda: self._transport, on_written=self._lines_written)
+        self.offline_buffer = OfflineBuffer(self._clock.now, offline_buffer_rules)
+        self.virtual_device_throttle = (
+            LatestValueThrottle(
+                loop, self._send_virtual_device_update_state, 1.0 / virtual_device_max_rate, self._clock
+            )
+            if virtual_device_max_rate
+            else None
+        )
         self._command_callback = command_callback
         self._event_callback = event_callback
+        if dispatch_workers is None and inspect.iscoroutinefunction(event_callback):
+            dispatch_workers = 1
+        self.event_dispatcher = (
+            EventDispatcher(
+                loop,
+                self._async_run_event_callback,
+                dispatch_workers,
+                dispatch_max_pending,
+                dispatch_overflow,
+                pause_reading=self._pause_reading,
+                resume_reading=self._resume_reading,
+            )
+            if dispatch_workers
+            else None
+        )
+        self._subscriptions: list[EventSubscription] = []
+        self._subscriptions_by_event: dict[str, list[EventSubscription]] = {}
+        self._subscriptions_to_all: list[EventSubscription] = []
+        self._event_handlers: dict[str, Callable[[Event], FlicButton | None]] = {
+            "button": self._handle_button_event,
+            "buttonAdded": self._handle_button_added,
+            "buttonDeleted": self._handle_button_deleted,
+            "buttonConnected": self._handle_button_connected,
+            "buttonDisconnected": self._handle_button_disconnected,
+            "buttonReady": self._handle_button_ready,
+            "actionMessage": self._handle_action_message,
+            "virtualDeviceUpdate": self._handle_virtual_device_update,
+        }
+        self._always_dispatched = set(ALWAYS_DISPATCHED_EVENTS)
         self._loop = loop
         self._server_address = (ip, port)
-        self._tcp_check_timer = time.time()
-        self._tcp_disconnect_timer = time.time()
+        self.metrics: MetricsCollector = metrics or MetricsCollector()
+        self._metric_labels: Labels = (("hub", f"{ip}:{port}"),)
+        self._metric_labels_cache: dict[tuple[str, str], Labels] = {}
+        self.tracer: EventTracer | None = tracer
+        if tracer is not None and tracer.clock is None:
+            tracer.clock = self._clock
         self._reconnect_timeout = reconnect_timeout
+        self._reconnect_policy = reconnect_policy or ReconnectPolicy(max_delay=reconnect_timeout)
+        self._disconnected_at: float | None = None
+        self.reconnect_stats = ReconnectStats()
+        self._heartbeat_interval = heartbeat_interval
+        self._heartbeat_max_missed = heartbeat_max_missed
+        self._heartbeat_task: asyncio.Task | None = None
+        self._ping_sent_at: float | None = None
+        self._missed_pongs = 0
+        self.round_trip_times = Histogram()
         self._timeout = timeout
-        self._data: dict = {}
-        self._buffer = b""
+        self._buffer = bytearray()
+        self._buffer_scanned = 0
+        self._discarding_line = False
+        self._max_line_length = max_line_length
+        self._decoder = get_decoder(json_decoder)
         self._connecting = False
         self._forced_disconnect = False
         self.async_on_connected = None
         self.async_on_disconnected = None
 
+    @property
+    def connected(self) -> bool:
+        return self._transport is not None
+
+    @property
+    def buttons(self) -> list[FlicButton]:
+        return self._button_store.as_list()
+
+    @buttons.setter
+    def buttons(self, buttons: list[FlicButton]):
+        self._button_store.replace_all(buttons)
+
+    def get_button(self, bdaddr: str) -> FlicButton | None:
+        """Return the known button with the given bluetooth address."""
+        return self._button_store.get(bdaddr)
+
+    def get_button_by_uuid(self, uuid: str) -> FlicButton | None:
+        """Return the known button with the given uuid."""
+        return self._button_store.get_by_uuid(uuid)
+
+    def get_button_by_serial_number(self, serial_number: str) -> FlicButton | None:
+        """Return the known button with the given serial number."""
+        return self._button_store.get_by_serial_number(serial_number)
+
     async def _async_connect(self):
-        """Connect to the socket."""
+        """Connect to the socket, waiting between attempts as decided by the reconnect policy."""
         try:
             while self._connecting and not self._forced_disconnect:
+                delay = self._reconnect_policy.next_delay()
+                if delay > 0:
+                    _LOGGER.info("Waiting %.1f secs before trying to connect again", delay)
+                    await self._clock.sleep(delay)
+                    if not self._connecting or self._forced_disconnect:
+                        return
+
                 _LOGGER.info("Trying to connect to %s", self._server_address)
+                self.metrics.inc("connect_attempts_total", labels=self._metric_labels)
                 try:
                     await asyncio.wait_for(
                         self._loop.create_connection(lambda: self, *self._server_address), self._reconnect_timeout
                     )
-                    self._tcp_check_timer = time.time()
-                    self._tcp_disconnect_timer = time.time()
-                    self._check_connection()
+                    self._reconnect_policy.reset()
+                    if self._disconnected_at is not None:
+                        latency = self._clock.now() - self._disconnected_at
+                        self.reconnect_stats.record_reconnect(latency)
+                        self.metrics.inc("reconnects_total", labels=self._metric_labels)
+                        self.metrics.observe("reconnect_latency_seconds", latency, labels=self._metric_labels)
+                        self._disconnected_at = None
                     return
                 except asyncio.TimeoutError:
                     _LOGGER.error("Connecting to socket timed out for %s", self._server_address)
-                    _LOGGER.info("Waiting %s secs before trying to connect again", self._reconnect_timeout)
-                    await asyncio.sleep(self._reconnect_timeout)
+                    self.reconnect_stats.record_failed_attempt()
+                    self.metrics.inc("connect_failures_total", labels=self._metric_labels)
                 except OSError:
                     _LOGGER.error("Failed to connect to socket at %s", self._server_address)
-                    _LOGGER.info("Waiting %s secs before trying to connect again", self._reconnect_timeout)
-                    await asyncio.sleep(self._reconnect_timeout)
+                    self.reconnect_stats.record_failed_attempt()
+                    self.metrics.inc("connect_failures_total", labels=self._metric_labels)
         except asyncio.CancelledError:
             _LOGGER.debug("Connect attempt to %s cancelled", self._server_address)
 
@@ -84,12 +244,52 @@ class FlicHubTcpClient(asyncio.Protocol):
         self._connecting = False
         self._forced_disconnect = True
 
+        self._stop_heartbeat()
+
+        if self.event_dispatcher is not None:
+            self.event_dispatcher.stop()
+        for subscription in list(self._subscriptions):
+            subscription.close()
+
+        if self.virtual_device_throttle is not None:
+            self.virtual_device_throttle.flush()
+        self.offline_buffer.clear()
+
         if self._transport is not None:
+            self.write_queue.flush()
             self._transport.close()
 
         if self.async_on_disconnected is not None:
             self._loop.create_task(self.async_on_disconnected())
 
+    def events(
+        self, filter: EventFilter | None = None, max_pending: int = MAX_PENDING_SUBSCRIBER_EVENTS
+    ) -> EventSubscription:
+        """
+        Subscribe to the events matching the filter, to be read with async for.
+        Each subscription has its own queue, so a slow subscriber only loses its own oldest events. The
+        subscription ends when it is closed or the client is disconnected.
+        """
+        subscription = EventSubscription(filter, max_pending, on_close=self._remove_subscription)
+        self._subscriptions.append(subscription)
+        if subscription.filter.events is None:
+            self._subscriptions_to_all.append(subscription)
+        else:
+            for event_type in subscription.filter.events:
+                self._subscriptions_by_event.setdefault(event_type, []).append(subscription)
+        return subscription
+
+    def _remove_subscription(self, subscription: EventSubscription):
+        self._subscriptions.remove(subscription)
+        if subscription.filter.events is None:
+            self._subscriptions_to_all.remove(subscription)
+            return
+        for event_type in subscription.filter.events:
+            subscriptions = self._subscriptions_by_event[event_type]
+            subscriptions.remove(subscription)
+            if not subscriptions:
+                del self._subscriptions_by_event[event_type]
+
     async def async_connect(self):
         self._connecting = True
         self._forced_disconnect = False
@@ -99,6 +299,18 @@ class FlicHubTcpClient(asyncio.Protocol):
         return self._async_send_command(cmd)
 
     def send_virtual_device_update_state(self, dimmable_type: str, virtual_device_id: str, values: dict):
+        """
+        Update the state of a virtual device on the hub.
+        If a max rate is configured, states for the same device sent faster than that rate replace each other and
+        only the latest one is sent.
+        """
+        if self.virtual_device_throttle is not None:
+            self.virtual_device_throttle.submit((dimmable_type, virtual_device_id), values)
+        else:
+            self._send_virtual_device_update_state((dimmable_type, virtual_device_id), values)
+
+    def _send_virtual_device_update_state(self, device: tuple[str, str], values: dict):
+        dimmable_type, virtual_device_id = device
         payload = json.dumps(
             {
                 "command": "virtualDeviceUpdateState",
@@ -107,17 +319,11 @@ class FlicHubTcpClient(asyncio.Protocol):
                 "values": values,
             }
         )
-        if self._transport is not None:
-            self._transport.write(f"{payload}\n".encode())
-        else:
-            _LOGGER.error("Connections seems to be closed.")
+        self._write_line(payload, "virtualDeviceUpdateState", device)
 
     def play_ir(self, signal_id: str):
         payload = json.dumps({"command": ServerCommand.PLAY_IR, "signal_id": signal_id})
-        if self._transport is not None:
-            self._transport.write(f"{payload}\n".encode())
-        else:
-            _LOGGER.error("Connections seems to be closed.")
+        self._write_line(payload, ServerCommand.PLAY_IR)
 
     def play_ir_raw(self, arr: list[int]):
         """
@@ -126,22 +332,45 @@ class FlicHubTcpClient(asyncio.Protocol):
         The following elements indicate in microseconds how long each pulse should be active or silent, alternating.
         """
         payload = json.dumps({"command": ServerCommand.PLAY_IR_RAW, "arr": arr})
-        if self._transport is not None:
-            self._transport.write(f"{payload}\n".encode())
-        else:
-            _LOGGER.error("Connection seems to be closed.")
+        self._write_line(payload, ServerCommand.PLAY_IR_RAW)
 
     async def get_buttons(self) -> list[FlicButton]:
-        command: Command = await self._async_send_command_and_wait_for_data(ServerCommand.BUTTONS)
+        command: Command = await self._async_request(ServerCommand.BUTTONS)
         return command.data if command is not None else []
 
+    async def get_button_details(self, *bdaddrs: str) -> list[FlicButton]:
+        """
+        Fetch the details of the given buttons and add them to the known buttons.
+        Falls back to fetching all buttons if the hub script doesn't support single button requests.
+        """
+        if not self._hub_supports(BUTTON_DETAILS_MIN_HUB_VERSION):
+            await self.get_buttons()
+            return [button for button in map(self.get_button, bdaddrs) if button is not None]
+
+        command: Command = await self._async_send_command_and_wait_for_data(ServerCommand.BUTTON, bdaddrs=bdaddrs)
+        return command.data if command is not None else []
+
+    async def async_sync_buttons(self) -> ButtonsDiff | None:
+        """
+        Bring the known buttons up to date with the hub, only transferring the buttons that were added or removed.
+        Falls back to fetching all buttons if the hub script doesn't support diffs.
+        """
+        if not self._hub_supports(BUTTON_DETAILS_MIN_HUB_VERSION):
+            await self.get_buttons()
+            return None
+
+        command: Command = await self._async_send_command_and_wait_for_data(
+            ServerCommand.BUTTONS_DIFF, known=self._button_store.bdaddrs
+        )
+        return command.data if command is not None else None
+
     async def get_server_info(self) -> ServerInfo | None:
-        command: Command = await self._async_send_command_and_wait_for_data(ServerCommand.SERVER_INFO)
-        return command.data
+        command: Command = await self._async_request(ServerCommand.SERVER_INFO)
+        return command.data if command is not None else None
 
     async def get_hubinfo(self) -> FlicHubInfo | None:
-        command: Command = await self._async_send_command_and_wait_for_data(ServerCommand.HUB_INFO)
-        return command.data
+        command: Command = await self._async_request(ServerCommand.HUB_INFO)
+        return command.data if command is not None else None
 
     async def async_check_for_updates(self):
         try:
@@ -169,165 +398,470 @@ class FlicHubTcpClient(asyncio.Protocol):
                 print(f"Please update the code in your Flic Hub: {UPDATE_LINK}")
 
     def _async_send_command(self, cmd: ServerCommand):
-        if self._transport is not None:
-            self._transport.write(f"{cmd}\n".encode())
-        else:
+        self._write_line(cmd, cmd)
+
+    def _write_line(self, line: str, command: str | None = None, key=None) -> bool:
+        """
+        Queue a line for writing.
+        Without a connection the line is kept in the offline buffer if the rule for its command allows it, and
+        written once the connection is made.
+        """
+        encoded = f"{line}\n".encode()
+        if self._transport is None:
+            if command is not None and self.offline_buffer.put(command, encoded, key):
+                _LOGGER.debug(f"Not connected, buffered '{command}' until the connection is made")
+            else:
+                _LOGGER.error("Connections seems to be closed.")
+            return False
+
+        self.write_queue.put(encoded, command, key)
+        return True
+
+    def _lines_written(self, lines: int, written: int):
+        self.metrics.inc("bytes_sent_total", written, labels=self._metric_labels)
+
+    async def _async_request(self, cmd: ServerCommand) -> Command | None:
+        """
+        Send a read command, sharing one request and its reply between concurrent callers.
+        Replies are reused for the time configured for the command in the cache.
+        """
+        cached = self.cache.get(cmd)
+        if cached is not None:
+            return cached
+
+        inflight = self._inflight.get(cmd)
+        if inflight is None or inflight.done():
+            inflight = self._loop.create_task(self._async_send_command_and_wait_for_data(cmd))
+            inflight.add_done_callback(partial(self._inflight_done, cmd))
+            self._inflight[cmd] = inflight
+        return await asyncio.shield(inflight)
+
+    def _inflight_done(self, cmd: ServerCommand, inflight: asyncio.Future):
+        if self._inflight.get(cmd) is inflight:
+            del self._inflight[cmd]
+        if not inflight.cancelled() and inflight.exception() is None and inflight.result() is not None:
+            self.cache.set(cmd, inflight.result())
+
+    async def _async_send_command_and_wait_for_data(self, cmd: ServerCommand, **params) -> Command | None:
+        """
+        Send a command and wait for its reply.
+        Several requests can be in flight at the same time. Replies are matched on the request id echoed by the
+        hub, or in order per command name for hub scripts that don't echo request ids.
+        Parameters can only be sent to hub scripts that support request ids.
+        """
+        if self._transport is None:
             _LOGGER.error("Connections seems to be closed.")
+            return None
 
-    async def _async_send_command_and_wait_for_data(self, cmd: ServerCommand) -> Command | None:
-        if self._transport is not None:
-            self._data_ready[cmd] = asyncio.Event()
-            self._transport.write(f"{cmd}\n".encode())
-            try:
-                with async_timeout.timeout(DATA_READY_TIMEOUT):
-                    await self._data_ready[cmd].wait()
-                    self._data_ready[cmd] = None
-                    return self._data[cmd]
-            except asyncio.TimeoutError:
-                _LOGGER.warning(f"Waited for '{cmd}' data for {DATA_READY_TIMEOUT} secs.")
-                return None
+        request_id = next(self._request_ids)
+        future = self._loop.create_future()
+        self._requests[request_id] = (cmd, future)
+        self._requests_by_command.setdefault(cmd, deque()).append(request_id)
+
+        if self._hub_supports(REQUEST_ID_MIN_HUB_VERSION):
+            self._write_line(json.dumps({"command": cmd, "request_id": request_id, **params}))
         else:
-            _LOGGER.error("Connections seems to be closed.")
+            self._write_line(cmd)
+
+        sent_at = self._clock.now()
+        try:
+            async with async_timeout.timeout(DATA_READY_TIMEOUT):
+                command = await future
+            self.metrics.observe(
+                "command_latency_seconds", self._clock.now() - sent_at, labels=self._labels("command", cmd)
+            )
+            return command
+        except asyncio.TimeoutError:
+            _LOGGER.warning(f"Waited for '{cmd}' data for {DATA_READY_TIMEOUT} secs.")
+            self.metrics.inc("command_timeouts_total", labels=self._labels("command", cmd))
+            return None
+        finally:
+            self._forget_request(request_id)
+
+    def _forget_request(self, request_id: int) -> asyncio.Future | None:
+        request = self._requests.pop(request_id, None)
+        if request is None:
+            return None
+
+        cmd, future = request
+        pending = self._requests_by_command[cmd]
+        if pending[0] == request_id:
+            pending.popleft()
+        else:
+            pending.remove(request_id)
+        return future
+
+    def _resolve_request(self, cmd: Command):
+        request_id = cmd.request_id
+        if request_id is not None and request_id not in self._requests:
+            _LOGGER.debug(f"Ignoring late reply to '{cmd.command}' request {request_id}")
+            return
+        if request_id is None:
+            # Hub scripts without request ids reply in the order the commands were sent
+            pending = self._requests_by_command.get(cmd.command)
+            if not pending:
+                return
+            request_id = pending[0]
+
+        future = self._forget_request(request_id)
+        if not future.done():
+            future.set_result(cmd)
+
+    def _cancel_requests(self):
+        for request_id in list(self._requests):
+            future = self._forget_request(request_id)
+            if not future.done():
+                future.set_result(None)
+
+    def _hub_supports(self, min_version: str) -> bool:
+        return bool(self._hub_version) and not is_newer(min_version, self._hub_version)
+
+    async def _async_negotiate(self):
+        """Fetch the hub script version to find out which protocol features it supports, and enable them."""
+        await self.get_server_info()
+        if self.tracer is not None and self._hub_supports(EVENT_TIMESTAMPS_MIN_HUB_VERSION):
+            await self._async_send_command_and_wait_for_data(ServerCommand.OPTIONS, event_timestamps=True)
 
     def connection_made(self, transport):
         self._transport = transport
+        if self._write_buffer_limits is not None:
+            transport.set_write_buffer_limits(*self._write_buffer_limits)
+        self._hub_version = None
+        self.cache.invalidate()
         _LOGGER.debug("Connection made")
+        self.metrics.set("connected", 1, labels=self._metric_labels)
+
+        for line, command, key in self.offline_buffer.drain_entries():
+            self.write_queue.put(line, command, key)
+
+        self._loop.create_task(self._async_negotiate())
+        self._start_heartbeat()
 
         if self.async_on_connected is not None:
             self._loop.create_task(self.async_on_connected())
 
     def data_received(self, data):
-        self._buffer += data
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("Data received: %r", data.decode("utf-8", errors="replace"))
+
+        received = self.tracer.start() if self.tracer is not None else None
+        lines = self._read_lines(data)
+        self.metrics.inc("bytes_received_total", len(data), labels=self._metric_labels)
+        self.metrics.inc("lines_received_total", len(lines), labels=self._metric_labels)
 
-        _LOGGER.debug("Data received: {!r}".format(data.decode("utf-8", errors="replace")))
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
 
-        while b"\n" in self._buffer:
-            line, self._buffer = self._buffer.split(b"\n", 1)
-            decoded_line = line.decode().strip()
-            if not decoded_line:
+            if line == b'"pong"' or line == b"pong":
+                self._handle_pong()
                 continue
 
-            if decoded_line == "pong":
-                pass
+            try:
+                msg = self._decoder.decode(line)
+            except Exception as e:
+                _LOGGER.warning(e, exc_info=True)
+                _LOGGER.warning("Unable to decode received data")
+                self.metrics.inc("decode_errors_total", labels=self._metric_labels)
+                continue
 
             try:
-                msg = json.loads(decoded_line, cls=_JSONDecoder)
                 if "event" in msg:
-                    self._handle_event(Event(**msg))
+                    self._handle_event(self._parse_event(msg, received))
                 if "command" in msg:
                     self._handle_command(Command(**msg))
             except Exception as e:
                 _LOGGER.warning(e, exc_info=True)
-                _LOGGER.warning("Unable to decode received data")
+                _LOGGER.warning("Unable to handle received data")
+                self.metrics.inc("handler_errors_total", labels=self._metric_labels)
+
+    def _start_heartbeat(self):
+        self._stop_heartbeat()
+        if self._heartbeat_interval:
+            self._heartbeat_task = self._loop.create_task(self._async_heartbeat())
+
+    def _stop_heartbeat(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        self._ping_sent_at = None
+        self._missed_pongs = 0
+
+    async def _async_heartbeat(self):
+        """Ping the hub every heartbeat interval and abort the connection when too many pongs are missed."""
+        while self._transport is not None:
+            if self.event_dispatcher is not None and self.event_dispatcher.reading_paused:
+                # Pongs can't be read while the event queue holds back reading, so they don't count as missed
+                await self._clock.sleep(self._heartbeat_interval)
+                continue
+
+            if self._ping_sent_at is not None:
+                self._missed_pongs += 1
+                self.metrics.inc("heartbeat_missed_total", labels=self._metric_labels)
+                if self._missed_pongs >= self._heartbeat_max_missed:
+                    _LOGGER.warning(f"No pong from {self._server_address} for {self._missed_pongs} pings, disconnecting")
+                    self._heartbeat_task = None
+                    self._transport.abort()
+                    return
+
+            self._ping_sent_at = self._clock.now()
+            self._write_line("ping")
+            await self._clock.sleep(self._heartbeat_interval)
+
+    def _handle_pong(self):
+        if self._ping_sent_at is None:
+            return
+        round_trip_time = self._clock.now() - self._ping_sent_at
+        self.round_trip_times.observe(round_trip_time)
+        self.metrics.observe("heartbeat_round_trip_seconds", round_trip_time, labels=self._metric_labels)
+        self._ping_sent_at = None
+        self._missed_pongs = 0
+
+    def pause_writing(self):
+        _LOGGER.debug("Transport buffer is full, pausing writes")
+        self.write_queue.pause()
+
+    def resume_writing(self):
+        _LOGGER.debug("Transport buffer drained, resuming writes")
+        self.write_queue.resume()
+
+    def _read_lines(self, data: bytes) -> list[bytes]:
+        """Split all complete lines off the receive buffer.
+
+        The buffer is scanned with an offset and compacted once per call, so a chunk holding many lines is not
+        copied once per line. Lines longer than the max line length are dropped.
+        """
+        buffer = self._buffer
+        buffer += data
+
+        lines = []
+        start = 0
+        view = memoryview(buffer)
+        try:
+            end = buffer.find(b"\n", self._buffer_scanned)
+            while end != -1:
+                if self._discarding_line:
+                    self._discarding_line = False
+                elif end - start > self._max_line_length:
+                    _LOGGER.warning("Dropped line of %s bytes, exceeds max line length", end - start)
+                    self.metrics.inc("lines_dropped_total", labels=self._metric_labels)
+                else:
+                    lines.append(bytes(view[start:end]))
+                start = end + 1
+                end = buffer.find(b"\n", start)
+        finally:
+            view.release()
+
+        if len(buffer) - start > self._max_line_length:
+            _LOGGER.warning("Dropped %s bytes of incomplete line, exceeds max line length", len(buffer) - start)
+            self.metrics.inc("lines_dropped_total", labels=self._metric_labels)
+            self._discarding_line = True
+            start = len(buffer)
+        elif self._discarding_line:
+            start = len(buffer)
+
+        del buffer[:start]
+        self._buffer_scanned = len(buffer)
+        return lines
 
     def connection_lost(self, exc):
         _LOGGER.info("Connection lost")
+        self.metrics.set("connected", 0, labels=self._metric_labels)
         self._connecting = True
+        self._disconnected_at = self._clock.now()
+        self._stop_heartbeat()
         self._transport = None
+        # Lines that were queued but never written, for example while writing was paused, get the same chance as
+        # lines sent while offline
+        for line, command, key in self.write_queue.take_unwritten():
+            if command is not None and not self._forced_disconnect:
+                self.offline_buffer.put(command, line, key)
+        self.cache.invalidate()
+        self._cancel_requests()
+        self._buffer.clear()
+        self._buffer_scanned = 0
+        self._discarding_line = False
+        if self.event_dispatcher is not None:
+            self.event_dispatcher.forget_paused_reading()
         self._loop.create_task(self._async_connect())
 
     def _handle_command(self, cmd: Command):
+        self.metrics.inc("commands_received_total", labels=self._labels("command", cmd.command))
         if cmd.command == ServerCommand.SERVER_INFO:
-            cmd.data = ServerInfo(**humps.decamelize(cmd.data))
+            cmd.data = ServerInfo(**decamelize_keys(cmd.data))
+            self._hub_version = cmd.data.version
         elif cmd.command == ServerCommand.BUTTONS:
-            self.buttons = [FlicButton(**button) for button in humps.decamelize(cmd.data)]
+            self.buttons = [_parse_button(button) for button in cmd.data]
             cmd.data = self.buttons
+        elif cmd.command == ServerCommand.BUTTON:
+            cmd.data = [_parse_button(button) for button in cmd.data]
+            for button in cmd.data:
+                self._button_store.add(button)
+        elif cmd.command == ServerCommand.BUTTONS_DIFF:
+            cmd.data = ButtonsDiff(
+                added=[_parse_button(button) for button in cmd.data.get("added", [])],
+                removed=cmd.data.get("removed", []),
+            )
+            for bdaddr in cmd.data.removed:
+                button = self._get_button(bdaddr)
+                if button is not None:
+                    self._button_store.remove(button)
+            for button in cmd.data.added:
+                self._button_store.add(button)
         elif cmd.command == ServerCommand.HUB_INFO:
-            cmd.data = FlicHubInfo(**humps.decamelize(cmd.data))
+            cmd.data = FlicHubInfo(**decamelize(cmd.data))
 
-        if self._data_ready[cmd.command] is not None and cmd.data is not None:
-            self._data_ready[cmd.command].set()
-            self._data[cmd.command] = cmd
+        self._resolve_request(cmd)
 
         if self._command_callback is not None:
             self._command_callback(cmd)
 
+    def register_event_handler(
+        self, event_type: str, handler: Callable[[Event], FlicButton | None], always_dispatch: bool = False
+    ):
+        """
+        Handle events of the given type with handler, replacing the built-in handler if there is one.
+        The handler returns the button the event is about, or None. The event callback is called for events with a
+        button, and, if always_dispatch is set, also for events without one.
+        """
+        self._event_handlers[event_type] = handler
+        if always_dispatch:
+            self._always_dispatched.add(event_type)
+        else:
+            self._always_dispatched.discard(event_type)
+
     def _handle_event(self, event: Event):
-        button = None
-        if event.event == "button":
-            button = self._get_button(event.button)
-            if button:
-                _LOGGER.debug(f"Button {button.name} was {event.action}")
-
-        elif event.event == "buttonAdded":
-            button = self._get_button(event.button)
-            if not button:
-                _LOGGER.debug(f"Button {event.button} added, fetching details")
-                self._loop.create_task(self.get_buttons())
-
-        elif event.event == "buttonDeleted":
-            button = self._get_button(event.button)
-            if button:
-                _LOGGER.debug(f"Button {button.name} deleted")
-                self.buttons.remove(button)
-
-        elif event.event == "buttonConnected":
-            button = self._get_button(event.button)
-            if button:
-                button.connected = True
-                _LOGGER.debug(f"Button {button.name} is connected")
-
-        elif event.event == "buttonDisconnected":
-            button = self._get_button(event.button)
-            if button:
-                button.connected = False
-                _LOGGER.debug(f"Button {button.name} is disconnected")
-
-        elif event.event == "buttonReady":
-            button = self._get_button(event.button)
-            if button:
-                button.ready = True
-                _LOGGER.debug(f"Button {button.name} is ready")
-
-        elif event.event == "actionMessage":
-            _LOGGER.debug(f"Action message received: {event.action}")
-
-        elif event.event == "virtualDeviceUpdate":
-            if event.meta_data and "virtual_device_id" in event.meta_data:
-                _LOGGER.debug(f"Virtual device update received: {event.meta_data['virtual_device_id']}")
-            if event.meta_data and "button_id" in event.meta_data:
-                button = self._get_button(event.meta_data["button_id"])
-
-        if self._event_callback is not None:
-            if event.event in [
-                "actionMessage",
-                "virtualDeviceUpdate",
-                "buttonAdded",
-                "buttonDeleted",
-                "buttonConnected",
-                "buttonDisconnected",
-                "buttonReady",
-                "irResult",
-            ]:
-                self._event_callback(button, event)
-            elif button is not None:
-                self._event_callback(button, event)
-
-    def _get_button(self, bdaddr: str) -> FlicButton:
-        return next((x for x in self.buttons if x.bdaddr == bdaddr), None)
-
-    def _check_connection(self):
-        """Check if connection is alive every reconnect_timeout seconds."""
-        if (self._tcp_disconnect_timer + 2 * self._reconnect_timeout) < time.time():
-            self._tcp_disconnect_timer = time.time()
-            raise OSError(f"No response from {self._server_address}. Disconnecting")
-        if (self._tcp_check_timer + self._reconnect_timeout) >= time.time():
+        self.metrics.inc("events_received_total", labels=self._labels("event", event.event))
+        subscriptions = self._subscriptions_by_event.get(event.event)
+        if subscriptions:
+            for subscription in subscriptions:
+                subscription.put(event)
+        for subscription in self._subscriptions_to_all:
+            subscription.put(event)
+
+        handler = self._event_handlers.get(event.event)
+        button = handler(event) if handler is not None else None
+
+        if self._event_callback is not None and (button is not None or event.event in self._always_dispatched):
+            self._dispatch_event(button, event)
+        elif event.trace is not None:
+            self.tracer.finish(event, event.trace)
+
+    def _handle_button_event(self, event: Event) -> FlicButton | None:
+        button = self._get_button(event.button)
+        if button:
+            _LOGGER.debug("Button %s was %s", button.name, event.action)
+        return button
+
+    def _handle_button_added(self, event: Event) -> FlicButton | None:
+        self.cache.invalidate(ServerCommand.BUTTONS)
+        button = self._get_button(event.button)
+        if not button:
+            _LOGGER.debug("Button %s added, fetching details", event.button)
+            self._loop.create_task(self.get_button_details(event.button))
+        return button
+
+    def _handle_button_deleted(self, event: Event) -> FlicButton | None:
+        self.cache.invalidate(ServerCommand.BUTTONS)
+        button = self._get_button(event.button)
+        if button:
+            _LOGGER.debug("Button %s deleted", button.name)
+            self._button_store.remove(button)
+        return button
+
+    def _handle_button_connected(self, event: Event) -> FlicButton | None:
+        self.cache.invalidate(ServerCommand.BUTTONS)
+        button = self._get_button(event.button)
+        if button:
+            button.connected = True
+            _LOGGER.debug("Button %s is connected", button.name)
+        return button
+
+    def _handle_button_disconnected(self, event: Event) -> FlicButton | None:
+        self.cache.invalidate(ServerCommand.BUTTONS)
+        button = self._get_button(event.button)
+        if button:
+            button.connected = False
+            _LOGGER.debug("Button %s is disconnected", button.name)
+        return button
+
+    def _handle_button_ready(self, event: Event) -> FlicButton | None:
+        button = self._get_button(event.button)
+        if button:
+            button.ready = True
+            _LOGGER.debug("Button %s is ready", button.name)
+        return button
+
+    def _handle_action_message(self, event: Event) -> FlicButton | None:
+        _LOGGER.debug("Action message received: %s", event.action)
+        return None
+
+    def _handle_virtual_device_update(self, event: Event) -> FlicButton | None:
+        if event.meta_data and "virtual_device_id" in event.meta_data:
+            _LOGGER.debug("Virtual device update received: %s", event.meta_data["virtual_device_id"])
+        if event.meta_data and "button_id" in event.meta_data:
+            return self._get_button(event.meta_data["button_id"])
+        return None
+
+    def _parse_event(self, msg: dict, received: EventTrace | None) -> Event:
+        if received is None:
+            return Event(**msg)
+
+        trace = EventTrace(received.received_at, received.received_wall_time)
+        event = Event(trace=trace, **msg)
+        trace.parsed_at = self.tracer.now()
+        return event
+
+    def _dispatch_event(self, button: FlicButton | None, event: Event):
+        """Call the event callback right away, or queue the call on the dispatcher if one is configured."""
+        if self.event_dispatcher is not None:
+            self.event_dispatcher.submit(event.button, button, event)
             return
 
-        msg = ""
-        self._transport.write(msg.encode())
-        self._tcp_check_timer = time.time()
+        trace = event.trace
+        if trace is not None:
+            trace.dispatched_at = self.tracer.now()
+        self._event_callback(button, event)
+        if trace is not None:
+            trace.completed_at = self.tracer.now()
+            self.tracer.finish(event, trace)
+
+    async def _async_run_event_callback(self, button: FlicButton | None, event: Event):
+        trace = event.trace
+        if trace is not None:
+            trace.dispatched_at = self.tracer.now()
+        try:
+            result = self._event_callback(button, event)
+            if inspect.isawaitable(result):
+                await result
+        finally:
+            if trace is not None:
+                trace.completed_at = self.tracer.now()
+                self.tracer.finish(event, trace)
+
+    def _pause_reading(self):
+        if self._transport is not None:
+            self._transport.pause_reading()
+
+    def _resume_reading(self):
+        if self._transport is not None:
+            self._transport.resume_reading()
 
+    def _labels(self, name: str, value: str) -> Labels:
+        """Return the metric labels of this client with one extra label, cached to keep the hot path cheap."""
+        labels = self._metric_labels_cache.get((name, value))
+        if labels is None:
+            labels = self._metric_labels_cache[(name, value)] = self._metric_labels + ((name, str(value)),)
+        return labels
 
-class _JSONDecoder(json.JSONDecoder):
-    def __init__(self, *args, **kwargs):
-        json.JSONDecoder.__init__(self, object_hook=self.object_hook, *args, **kwargs)
+    def _get_button(self, bdaddr: str) -> FlicButton | None:
+        return self._button_store.get(bdaddr)
 
-    def object_hook(self, obj):
-        ret = {}
-        for key, value in obj.items():
-            if key in {"batteryTimestamp"}:
-                ret[key] = datetime.fromtimestamp(value / 1000)
-            else:
-                ret[key] = value
-        return ret
+
+def _parse_button(data: dict) -> FlicButton:
+    button = decamelize_keys(data)
+    battery_timestamp = button.get("battery_timestamp")
+    if battery_timestamp is not None:
+        button["battery_timestamp"] = datetime.fromtimestamp(battery_timestamp / 1000)
+    return FlicButton(**button)
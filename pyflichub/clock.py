@@ -0,0 +1,77 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+
+class Clock:
+    """A monotonic time source for timers, with a sleep that follows the same time."""
+
+    def now_ns(self) -> int:
+        raise NotImplementedError
+
+    def now(self) -> float:
+        """The current time in seconds."""
+        return self.now_ns() / 1_000_000_000
+
+    def now_ms(self) -> float:
+        """The current time in milliseconds."""
+        return self.now_ns() / 1_000_000
+
+    async def sleep(self, seconds: float):
+        raise NotImplementedError
+
+
+class MonotonicClock(Clock):
+    """Real time from time.monotonic_ns, which is not affected by changes of the system clock."""
+
+    def now_ns(self) -> int:
+        return time.monotonic_ns()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+
+MONOTONIC_CLOCK = MonotonicClock()
+
+
+class VirtualClock(Clock):
+    """
+    A clock that only moves when told to, for simulating time in tests.
+    Sleeping tasks are woken up when the clock is moved past the end of their sleep. Use run_for to let each of
+    them run at the moment it wakes up, so timers behave the same as in real time without the waiting.
+    """
+
+    def __init__(self, start_ns: int = 0):
+        self._now_ns = start_ns
+        self._sleepers: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    def now_ns(self) -> int:
+        return self._now_ns
+
+    async def sleep(self, seconds: float):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self._now_ns + int(seconds * 1_000_000_000), next(self._sequence), future))
+        await future
+
+    def advance(self, seconds: float):
+        """Move the clock forward and wake up the sleepers that are due, without letting them run yet."""
+        target = self._now_ns + int(seconds * 1_000_000_000)
+        while self._sleepers and self._sleepers[0][0] <= target:
+            _, _, future = heapq.heappop(self._sleepers)
+            if not future.done():
+                future.set_result(None)
+        self._now_ns = target
+
+    async def run_for(self, seconds: float):
+        """Move the clock forward one wake-up at a time, letting each woken task run before moving on."""
+        target = self._now_ns + int(seconds * 1_000_000_000)
+        while self._sleepers and self._sleepers[0][0] <= target:
+            wake_ns, _, future = heapq.heappop(self._sleepers)
+            self._now_ns = max(self._now_ns, wake_ns)
+            if not future.done():
+                future.set_result(None)
+                # Let the woken task run until it waits again
+                await asyncio.sleep(0)
+        self._now_ns = target
@@ -1,11 +1,11 @@
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Optional
 
 from pyflichub.server_command import ServerCommand
 
 
-@dataclass
+@dataclass(slots=True)
 class Command:
-    def __init__(self, command: ServerCommand, data: Any):
-        self.command = command
-        self.data = data
+    command: ServerCommand
+    data: Any
+    request_id: Optional[int] = None
@@ -0,0 +1,93 @@
+import json
+from functools import lru_cache
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+class JsonDecoder:
+    """Base class for decoding a received line into Python objects."""
+
+    name: str
+
+    def decode(self, line: bytes) -> Any:
+        raise NotImplementedError
+
+
+class StdlibDecoder(JsonDecoder):
+    """Decodes lines using the json module from the standard library."""
+
+    name = "json"
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+
+    def decode(self, line: bytes) -> Any:
+        return self._decoder.decode(line.decode())
+
+
+class OrjsonDecoder(JsonDecoder):
+    """Decodes lines using orjson."""
+
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("orjson is not installed")
+
+    def decode(self, line: bytes) -> Any:
+        return orjson.loads(line)
+
+
+class MsgspecDecoder(JsonDecoder):
+    """Decodes lines using msgspec."""
+
+    name = "msgspec"
+
+    def __init__(self):
+        if msgspec is None:
+            raise ImportError("msgspec is not installed")
+        self._decoder = msgspec.json.Decoder()
+
+    def decode(self, line: bytes) -> Any:
+        return self._decoder.decode(line)
+
+
+DECODERS = {decoder.name: decoder for decoder in (MsgspecDecoder, OrjsonDecoder, StdlibDecoder)}
+
+
+def available_decoders() -> list[str]:
+    """Return the names of the decoders that can be used, fastest first."""
+    available = []
+    if msgspec is not None:
+        available.append(MsgspecDecoder.name)
+    if orjson is not None:
+        available.append(OrjsonDecoder.name)
+    available.append(StdlibDecoder.name)
+    return available
+
+
+def get_decoder(name: Optional[str] = None) -> JsonDecoder:
+    """
+    Return a decoder instance.
+    If no name is given the fastest installed backend is used, falling back to the standard library.
+    Decoders are stateless, so one instance per backend is shared by all clients.
+    """
+    if name is None:
+        name = available_decoders()[0]
+    return _get_decoder(name)
+
+
+@lru_cache(maxsize=None)
+def _get_decoder(name: str) -> JsonDecoder:
+    if name not in DECODERS:
+        raise ValueError(f"Unknown JSON decoder '{name}', expected one of {', '.join(DECODERS)}")
+    return DECODERS[name]()
@@ -0,0 +1,147 @@
+import asyncio
+import inspect
+import logging
+from collections import deque
+from enum import StrEnum
+from typing import Callable, Hashable, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+MAX_PENDING_EVENTS = 100
+
+
+class OverflowPolicy(StrEnum):
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    PAUSE_READING = "pause_reading"
+
+
+class EventDispatcher:
+    """
+    Runs event callbacks on worker tasks, so a slow callback doesn't hold up reading from the hub.
+    Events are spread over the workers by key, so events with the same key, like the same button, are handled in
+    the order they arrived. The callback may be a plain function or a coroutine function.
+    When the queue of a worker holds max_pending events, the overflow policy decides whether the oldest or the new
+    event is dropped, or whether reading from the hub is paused until the queues are half empty again.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        callback: Callable,
+        workers: int = 1,
+        max_pending: int = MAX_PENDING_EVENTS,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        pause_reading: Optional[Callable[[], None]] = None,
+        resume_reading: Optional[Callable[[], None]] = None,
+    ):
+        if workers < 1:
+            raise ValueError("An event dispatcher needs at least one worker")
+
+        self._loop = loop
+        self._callback = callback
+        self._max_pending = max_pending
+        self._overflow = OverflowPolicy(overflow)
+        self._pause_reading = pause_reading
+        self._resume_reading = resume_reading
+        self._queues: list[deque[tuple]] = [deque() for _ in range(workers)]
+        self._wakeups: list[asyncio.Event] = [asyncio.Event() for _ in range(workers)]
+        self._tasks: list[asyncio.Task] = []
+        self._unfinished = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._reading_paused = False
+
+        self.dispatched = 0
+        self.dropped = 0
+        self.errors = 0
+        self.max_depth = 0
+
+    @property
+    def reading_paused(self) -> bool:
+        return self._reading_paused
+
+    def forget_paused_reading(self):
+        """Forget that reading was paused, because the transport it was paused on is gone."""
+        self._reading_paused = False
+
+    @property
+    def pending(self) -> int:
+        return sum(map(len, self._queues))
+
+    def submit(self, key: Hashable, *args) -> bool:
+        """Queue a call of the callback with the given arguments. Returns False if the event was dropped."""
+        if not self._tasks:
+            self.start()
+
+        index = hash(key) % len(self._queues)
+        queue = self._queues[index]
+        if len(queue) >= self._max_pending:
+            if self._overflow == OverflowPolicy.DROP_NEWEST:
+                self.dropped += 1
+                _LOGGER.warning("Event queue is full, dropped the newest event")
+                return False
+            if self._overflow == OverflowPolicy.DROP_OLDEST:
+                queue.popleft()
+                self._unfinished -= 1
+                self.dropped += 1
+                _LOGGER.warning("Event queue is full, dropped the oldest event")
+            elif not self._reading_paused and self._pause_reading is not None:
+                _LOGGER.debug("Event queue is full, pausing reading")
+                self._reading_paused = True
+                self._pause_reading()
+
+        queue.append(args)
+        self.max_depth = max(self.max_depth, len(queue))
+        self._unfinished += 1
+        self._idle.clear()
+        self._wakeups[index].set()
+        return True
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [self._loop.create_task(self._async_worker(index)) for index in range(len(self._queues))]
+
+    def stop(self):
+        """Stop the workers and drop the events that haven't been handled yet."""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        for queue in self._queues:
+            queue.clear()
+        self._unfinished = 0
+        self._idle.set()
+        self._maybe_resume_reading()
+
+    async def join(self):
+        """Wait until all queued events have been handled."""
+        await self._idle.wait()
+
+    async def _async_worker(self, index: int):
+        queue = self._queues[index]
+        wakeup = self._wakeups[index]
+        while True:
+            while queue:
+                args = queue.popleft()
+                self._maybe_resume_reading()
+                try:
+                    result = self._callback(*args)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception:
+                    _LOGGER.exception("Error in event callback")
+                    self.errors += 1
+                self.dispatched += 1
+                self._unfinished -= 1
+                if not self._unfinished:
+                    self._idle.set()
+
+            wakeup.clear()
+            await wakeup.wait()
+
+    def _maybe_resume_reading(self):
+        if self._reading_paused and all(len(queue) <= self._max_pending // 2 for queue in self._queues):
+            _LOGGER.debug("Event queue drained, resuming reading")
+            self._reading_paused = False
+            if self._resume_reading is not None:
+                self._resume_reading()
@@ -1,13 +1,17 @@
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Optional, TYPE_CHECKING
 
+if TYPE_CHECKING:
+    from pyflichub.tracing import EventTrace
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class Event:
-    def __init__(self, event: str, button: Optional[str] = None, action: Optional[str] = None, button_number: Optional[int] = None, meta_data: Optional[dict] = None, values: Optional[dict] = None):
-        self.event = event
-        self.button = button
-        self.action = action
-        self.button_number = button_number
-        self.meta_data = meta_data
-        self.values = values
+    event: str
+    button: Optional[str] = None
+    action: Optional[str] = None
+    button_number: Optional[int] = None
+    meta_data: Optional[dict] = None
+    values: Optional[dict] = None
+    hub_time: Optional[int] = None
+    trace: Optional["EventTrace"] = field(default=None, compare=False, repr=False)
@@ -1,37 +1,33 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, InitVar
+from typing import Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class WifiInfo:
-    state: str
-    ssid: str
+    connected: bool
+    ip: str
+    mac: str
+    state: Optional[str] = None
+    ssid: Optional[str] = None
 
-    def __init__(self, connected, ip, mac):
-        self.connected = connected
-        self.ip = ip
-        self.mac = mac
 
-
-@dataclass
+@dataclass(slots=True)
 class EthernetInfo:
-    def __init__(self, connected, ip, mac):
-        self.connected = connected
-        self.ip = ip
-        self.mac = mac
+    connected: bool
+    ip: str
+    mac: str
 
 
-@dataclass
+@dataclass(slots=True)
 class DhcpInfo:
-    def __init__(self, wifi=None, ethernet=None):
-        self.wifi = WifiInfo(**wifi) if wifi else None
-        self.ethernet = EthernetInfo(**ethernet) if ethernet else None
-
+    wifi: Optional[WifiInfo] = None
+    ethernet: Optional[EthernetInfo] = None
 
-@dataclass
-class _WifiState:
-    def __init__(self, state, ssid):
-        self.state = state
-        self.ssid = ssid
+    def __post_init__(self):
+        if isinstance(self.wifi, dict):
+            self.wifi = WifiInfo(**self.wifi) if self.wifi else None
+        if isinstance(self.ethernet, dict):
+            self.ethernet = EthernetInfo(**self.ethernet) if self.ethernet else None
 
 
 def _decode_ssid(ssid):
@@ -40,23 +36,28 @@ def _decode_ssid(ssid):
     return ''.join(chr(byte) for byte in ssid)
 
 
-@dataclass
+@dataclass(slots=True)
 class FlicHubInfo:
-    def __init__(self, dhcp, wifi_state=None):
-        self._dhcp = DhcpInfo(**dhcp)
-        self._dhcp.wifi.state = wifi_state.get('state', None) if wifi_state else None
-        self._dhcp.wifi.ssid = _decode_ssid(wifi_state.get('ssid', None)) if wifi_state else None
+    dhcp: DhcpInfo
+    wifi_state: InitVar[Optional[dict]] = None
+
+    def __post_init__(self, wifi_state):
+        if isinstance(self.dhcp, dict):
+            self.dhcp = DhcpInfo(**self.dhcp)
+        if self.dhcp.wifi is not None:
+            self.dhcp.wifi.state = wifi_state.get('state', None) if wifi_state else None
+            self.dhcp.wifi.ssid = _decode_ssid(wifi_state.get('ssid', None)) if wifi_state else None
 
     def has_wifi(self) -> bool:
-        return self._dhcp.wifi is not None
+        return self.dhcp.wifi is not None
 
     def has_ethernet(self) -> bool:
-        return self._dhcp.ethernet is not None
+        return self.dhcp.ethernet is not None
 
     @property
     def wifi(self) -> WifiInfo:
-        return self._dhcp.wifi
+        return self.dhcp.wifi
 
     @property
     def ethernet(self) -> EthernetInfo:
-        return self._dhcp.ethernet
+        return self.dhcp.ethernet
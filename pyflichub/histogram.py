@@ -0,0 +1,52 @@
+from bisect import bisect_left
+from typing import Optional, Sequence
+
+# Upper bounds in seconds, suitable for network round trips and processing latencies
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Counts observed values in buckets with fixed upper bounds, like a Prometheus histogram."""
+
+    __slots__ = ("buckets", "_counts", "count", "sum", "min", "max")
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # The last count is for values above the largest bucket
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float):
+        self._counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def average(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def cumulative_counts(self) -> list[tuple[float, int]]:
+        """Return (upper bound, number of values less than or equal to it) pairs, ending with +Inf."""
+        cumulative = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self._counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile as the upper bound of the bucket it falls in."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative_counts():
+            if total >= rank:
+                return min(bound, self.max)
+        return self.max
@@ -0,0 +1,62 @@
+from functools import lru_cache
+from typing import Any
+
+import humps
+
+# Keys sent by tcpserver.js, mapped to the argument names used by the models
+KEY_MAP = {
+    # buttons
+    "bdaddr": "bdaddr",
+    "serialNumber": "serial_number",
+    "color": "color",
+    "name": "name",
+    "activeDisconnect": "active_disconnect",
+    "connected": "connected",
+    "ready": "ready",
+    "batteryStatus": "battery_status",
+    "uuid": "uuid",
+    "flicVersion": "flic_version",
+    "firmwareVersion": "firmware_version",
+    "key": "key",
+    "passiveMode": "passive_mode",
+    "batteryTimestamp": "battery_timestamp",
+    "bootId": "boot_id",
+    # server
+    "version": "version",
+    # network
+    "dhcp": "dhcp",
+    "wifi": "wifi",
+    "ethernet": "ethernet",
+    "ip": "ip",
+    "mac": "mac",
+    "wifiState": "wifi_state",
+    "state": "state",
+    "ssid": "ssid",
+}
+
+
+@lru_cache(maxsize=256)
+def _decamelize_unknown(key: str) -> str:
+    return humps.decamelize(key)
+
+
+def decamelize_key(key: str) -> str:
+    """Return the snake_case version of a key, using the precomputed table for keys known from the hub."""
+    snake_key = KEY_MAP.get(key)
+    if snake_key is None:
+        return _decamelize_unknown(key)
+    return snake_key
+
+
+def decamelize_keys(data: dict) -> dict:
+    """Translate the keys of a flat dict to snake_case."""
+    return {decamelize_key(key): value for key, value in data.items()}
+
+
+def decamelize(data: Any) -> Any:
+    """Translate the keys of all dicts in a nested structure to snake_case."""
+    if isinstance(data, dict):
+        return {decamelize_key(key): decamelize(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [decamelize(value) for value in data]
+    return data
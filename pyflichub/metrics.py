@@ -0,0 +1,104 @@
+from typing import Iterable, Sequence
+
+from pyflichub.histogram import Histogram, LATENCY_BUCKETS
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class MetricsCollector:
+    """
+    Receives the metrics of a client.
+    This implementation discards everything, subclass it to send the metrics somewhere.
+    """
+
+    def inc(self, name: str, value: float = 1.0, labels: Labels = ()):
+        """Increase a counter."""
+
+    def observe(self, name: str, value: float, labels: Labels = ()):
+        """Add a value, usually a latency in seconds, to a histogram."""
+
+    def set(self, name: str, value: float, labels: Labels = ()):
+        """Set a gauge."""
+
+
+class InMemoryCollector(MetricsCollector):
+    """Keeps all metrics in memory, so they can be read or exported with to_prometheus_text."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self._buckets = buckets
+        self.counters: dict[str, dict[Labels, float]] = {}
+        self.histograms: dict[str, dict[Labels, Histogram]] = {}
+        self.gauges: dict[str, dict[Labels, float]] = {}
+
+    def inc(self, name: str, value: float = 1.0, labels: Labels = ()):
+        series = self.counters.get(name)
+        if series is None:
+            series = self.counters[name] = {}
+        series[labels] = series.get(labels, 0.0) + value
+
+    def observe(self, name: str, value: float, labels: Labels = ()):
+        series = self.histograms.get(name)
+        if series is None:
+            series = self.histograms[name] = {}
+        histogram = series.get(labels)
+        if histogram is None:
+            histogram = series[labels] = Histogram(self._buckets)
+        histogram.observe(value)
+
+    def set(self, name: str, value: float, labels: Labels = ()):
+        series = self.gauges.get(name)
+        if series is None:
+            series = self.gauges[name] = {}
+        series[labels] = value
+
+    def counter(self, name: str, **labels: str) -> float:
+        """Return the value of a counter, summed over all series matching the given labels."""
+        return sum(value for key, value in self.counters.get(name, {}).items() if _matches(key, labels))
+
+    def histogram(self, name: str, **labels: str) -> Histogram | None:
+        """Return the histogram of the first series matching the given labels."""
+        return next((h for key, h in self.histograms.get(name, {}).items() if _matches(key, labels)), None)
+
+
+def _matches(key: Labels, labels: dict[str, str]) -> bool:
+    return all(item in key for item in labels.items())
+
+
+def _format_labels(labels: Iterable[tuple[str, str]]) -> str:
+    formatted = ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+    return f"{{{formatted}}}" if formatted else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def to_prometheus_text(collector: InMemoryCollector, prefix: str = "flichub_") -> str:
+    """Render the metrics of a collector in the Prometheus text exposition format."""
+    lines = []
+    for name, series in sorted(collector.counters.items()):
+        lines.append(f"# TYPE {prefix}{name} counter")
+        for labels, value in series.items():
+            lines.append(f"{prefix}{name}{_format_labels(labels)} {_format_value(value)}")
+
+    for name, series in sorted(collector.gauges.items()):
+        lines.append(f"# TYPE {prefix}{name} gauge")
+        for labels, value in series.items():
+            lines.append(f"{prefix}{name}{_format_labels(labels)} {_format_value(value)}")
+
+    for name, series in sorted(collector.histograms.items()):
+        lines.append(f"# TYPE {prefix}{name} histogram")
+        for labels, histogram in series.items():
+            for bound, count in histogram.cumulative_counts():
+                bucket_labels = _format_labels(labels + (("le", _format_value(bound)),))
+                lines.append(f"{prefix}{name}_bucket{bucket_labels} {count}")
+            lines.append(f"{prefix}{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+            lines.append(f"{prefix}{name}_count{_format_labels(labels)} {histogram.count}")
+
+    return "\n".join(lines) + "\n"
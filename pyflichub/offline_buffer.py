@@ -0,0 +1,101 @@
+import itertools
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import StrEnum
+from typing import Callable, Hashable, Optional
+
+from pyflichub.server_command import ServerCommand
+
+_LOGGER = logging.getLogger(__name__)
+
+MAX_BUFFERED_LINES = 100
+
+
+class BufferPolicy(StrEnum):
+    DROP = "drop"
+    KEEP_LATEST = "keep_latest"
+    KEEP_ALL = "keep_all"
+
+
+@dataclass
+class BufferRule:
+    policy: BufferPolicy
+    ttl: Optional[float] = None
+
+
+DEFAULT_BUFFER_RULES = {
+    "virtualDeviceUpdateState": BufferRule(BufferPolicy.KEEP_LATEST, ttl=30.0),
+    ServerCommand.PLAY_IR: BufferRule(BufferPolicy.KEEP_ALL, ttl=5.0),
+    ServerCommand.PLAY_IR_RAW: BufferRule(BufferPolicy.KEEP_ALL, ttl=5.0),
+}
+
+
+class OfflineBuffer:
+    """
+    Holds lines sent while there is no connection, so they can be written once the connection is made.
+    What is kept depends on the rule of the command: nothing, only the latest line per key, or every line. Lines
+    older than the ttl of their rule are dropped when the buffer is drained.
+    """
+
+    def __init__(
+        self,
+        time_func: Callable[[], float],
+        rules: Optional[dict[str, BufferRule]] = None,
+        max_lines: int = MAX_BUFFERED_LINES,
+    ):
+        self._time = time_func
+        self.rules = {**DEFAULT_BUFFER_RULES, **(rules or {})}
+        self._max_lines = max_lines
+        self._lines: OrderedDict[Hashable, tuple[float, Optional[float], bytes, str, Hashable]] = OrderedDict()
+        self._sequence = itertools.count()
+
+        self.lines_buffered = 0
+        self.lines_replaced = 0
+        self.lines_dropped = 0
+        self.lines_expired = 0
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def put(self, command: str, line: bytes, key: Hashable = None) -> bool:
+        """Buffer a line according to the rule of its command. Returns False if the line was dropped."""
+        rule = self.rules.get(command)
+        if rule is None or rule.policy == BufferPolicy.DROP:
+            self.lines_dropped += 1
+            return False
+
+        if rule.policy == BufferPolicy.KEEP_LATEST:
+            entry_key = (command, key)
+            if self._lines.pop(entry_key, None) is not None:
+                self.lines_replaced += 1
+        else:
+            entry_key = (command, next(self._sequence))
+
+        if len(self._lines) >= self._max_lines:
+            self._lines.popitem(last=False)
+            self.lines_dropped += 1
+            _LOGGER.warning("Offline buffer is full, dropped the oldest line")
+
+        self._lines[entry_key] = (self._time(), rule.ttl, line, command, key)
+        self.lines_buffered += 1
+        return True
+
+    def drain(self) -> list[bytes]:
+        """Remove and return the buffered lines that haven't expired, oldest first."""
+        return [line for line, _, _ in self.drain_entries()]
+
+    def drain_entries(self) -> list[tuple[bytes, str, Hashable]]:
+        """Like drain, but returns each line with its command and key."""
+        now = self._time()
+        entries = []
+        for buffered_at, ttl, line, command, key in self._lines.values():
+            if ttl is not None and now - buffered_at > ttl:
+                self.lines_expired += 1
+                continue
+            entries.append((line, command, key))
+        self._lines.clear()
+        return entries
+
+    def clear(self):
+        self._lines.clear()
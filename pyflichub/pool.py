@@ -0,0 +1,150 @@
+import asyncio
+import inspect
+import logging
+from functools import partial
+from typing import Any, Awaitable, Callable, Optional
+
+from pyflichub.button import FlicButton
+from pyflichub.client import FlicHubTcpClient
+from pyflichub.command import Command
+from pyflichub.event import Event
+from pyflichub.flichub import FlicHubInfo
+from pyflichub.server_info import ServerInfo
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8124
+MAX_CONCURRENCY = 16
+
+
+class FlicHubPool:
+    """
+    Manages the connections to several Flic Hubs on one event loop.
+    Events and commands of all hubs are passed to the callbacks together with the id of the hub they came from.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        event_callback: Optional[Callable[[str, Optional[FlicButton], Event], None]] = None,
+        command_callback: Optional[Callable[[str, Command], None]] = None,
+        max_concurrency: int = MAX_CONCURRENCY,
+        **client_kwargs,
+    ):
+        self._loop = loop
+        self._event_callback = event_callback
+        self._command_callback = command_callback
+        self._max_concurrency = max_concurrency
+        self._client_kwargs = client_kwargs
+        self._clients: dict[str, FlicHubTcpClient] = {}
+        self._connect_tasks: dict[str, asyncio.Task] = {}
+        self._connecting = False
+
+    @property
+    def hub_ids(self) -> list[str]:
+        return list(self._clients)
+
+    @property
+    def connected_hub_ids(self) -> list[str]:
+        return [hub_id for hub_id, client in self._clients.items() if client.connected]
+
+    def get_client(self, hub_id: str) -> Optional[FlicHubTcpClient]:
+        return self._clients.get(hub_id)
+
+    def add_hub(self, hub_id: str, ip: str, port: int = DEFAULT_PORT, **client_kwargs) -> FlicHubTcpClient:
+        """Add a hub to the pool. The hub is connected right away if the pool is connecting."""
+        if hub_id in self._clients:
+            raise ValueError(f"Hub '{hub_id}' is already in the pool")
+
+        kwargs = {**self._client_kwargs, **client_kwargs}
+        if inspect.iscoroutinefunction(self._event_callback):
+            # The client can't tell the wrapped callback is a coroutine function, so it needs a dispatcher
+            kwargs.setdefault("dispatch_workers", 1)
+
+        client = FlicHubTcpClient(
+            ip,
+            port,
+            self._loop,
+            event_callback=partial(self._on_event, hub_id),
+            command_callback=partial(self._on_command, hub_id),
+            **kwargs,
+        )
+        self._clients[hub_id] = client
+        if self._connecting:
+            self._connect(hub_id)
+        return client
+
+    def remove_hub(self, hub_id: str):
+        """Disconnect a hub and remove it from the pool."""
+        client = self._clients.pop(hub_id)
+        task = self._connect_tasks.pop(hub_id, None)
+        if task is not None:
+            task.cancel()
+        client.disconnect()
+
+    def connect(self):
+        """Start connecting to all hubs. Each hub keeps reconnecting on its own until the pool is disconnected."""
+        self._connecting = True
+        for hub_id in self._clients:
+            if hub_id not in self._connect_tasks:
+                self._connect(hub_id)
+
+    def disconnect(self):
+        self._connecting = False
+        for task in self._connect_tasks.values():
+            task.cancel()
+        self._connect_tasks.clear()
+        for client in self._clients.values():
+            client.disconnect()
+
+    async def gather_buttons(self) -> dict[str, list[FlicButton]]:
+        """Fetch the buttons of all connected hubs."""
+        return await self._gather(lambda client: client.get_buttons())
+
+    async def gather_server_info(self) -> dict[str, Optional[ServerInfo]]:
+        """Fetch the server info of all connected hubs."""
+        return await self._gather(lambda client: client.get_server_info())
+
+    async def gather_hubinfo(self) -> dict[str, Optional[FlicHubInfo]]:
+        """Fetch the network info of all connected hubs."""
+        return await self._gather(lambda client: client.get_hubinfo())
+
+    def get_button(self, bdaddr: str) -> tuple[Optional[str], Optional[FlicButton]]:
+        """Return the id of the hub a button is paired with, and the button."""
+        for hub_id, client in self._clients.items():
+            button = client.get_button(bdaddr)
+            if button is not None:
+                return hub_id, button
+        return None, None
+
+    def _connect(self, hub_id: str):
+        task = self._loop.create_task(self._clients[hub_id].async_connect())
+        self._connect_tasks[hub_id] = task
+
+    async def _gather(self, request: Callable[[FlicHubTcpClient], Awaitable[Any]]) -> dict[str, Any]:
+        """Run a request against all connected hubs with at most max_concurrency requests in flight."""
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        async def run(client: FlicHubTcpClient):
+            async with semaphore:
+                return await request(client)
+
+        hub_ids = self.connected_hub_ids
+        results = await asyncio.gather(*(run(self._clients[hub_id]) for hub_id in hub_ids), return_exceptions=True)
+
+        gathered = {}
+        for hub_id, result in zip(hub_ids, results):
+            if isinstance(result, Exception):
+                _LOGGER.warning(f"Request to hub '{hub_id}' failed: {result}")
+                continue
+            gathered[hub_id] = result
+        return gathered
+
+    def _on_event(self, hub_id: str, button: Optional[FlicButton], event: Event) -> Optional[Awaitable]:
+        if self._event_callback is not None:
+            return self._event_callback(hub_id, button, event)
+        return None
+
+    def _on_command(self, hub_id: str, command: Command):
+        if self._command_callback is not None:
+            self._command_callback(hub_id, command)
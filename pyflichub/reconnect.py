@@ -0,0 +1,73 @@
+import random
+from typing import Callable, Optional
+
+
+class ReconnectPolicy:
+    """
+    Decides how long to wait before each connection attempt.
+    The first attempt is made right away. After that the delay grows exponentially from base_delay up to max_delay,
+    and a random part of up to jitter times the delay is taken off so clients that lost their connection at the same
+    time don't reconnect in lockstep. The delays start over when reset is called after a successful connection.
+    """
+
+    def __init__(
+        self,
+        initial_delay: float = 0.0,
+        base_delay: float = 0.5,
+        max_delay: float = 10.0,
+        factor: float = 2.0,
+        jitter: float = 0.5,
+        random_func: Callable[[], float] = random.random,
+    ):
+        self.initial_delay = initial_delay
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.jitter = jitter
+        self._random = random_func
+        self._attempt = 0
+        self._delay = 0.0
+
+    @property
+    def attempt(self) -> int:
+        """Number of attempts made since the last reset."""
+        return self._attempt
+
+    def next_delay(self) -> float:
+        attempt = self._attempt
+        self._attempt += 1
+        if attempt == 0:
+            return self.initial_delay
+
+        # Grow the previous delay instead of raising factor to the attempt, which overflows after long outages
+        self._delay = self.base_delay if attempt == 1 else min(self.max_delay, self._delay * self.factor)
+        delay = min(self.max_delay, self._delay)
+        return delay * (1 - self.jitter * self._random())
+
+    def reset(self):
+        self._attempt = 0
+        self._delay = 0.0
+
+
+class ReconnectStats:
+    """Counts reconnects and measures the time from losing a connection to being connected again."""
+
+    def __init__(self):
+        self.reconnects = 0
+        self.failed_attempts = 0
+        self.last_latency: Optional[float] = None
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+
+    @property
+    def average_latency(self) -> Optional[float]:
+        return self.total_latency / self.reconnects if self.reconnects else None
+
+    def record_reconnect(self, latency: float):
+        self.reconnects += 1
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency, latency)
+        self.total_latency += latency
+
+    def record_failed_attempt(self):
+        self.failed_attempts += 1
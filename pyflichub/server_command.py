@@ -3,7 +3,10 @@ from enum import StrEnum
 
 class ServerCommand(StrEnum):
     BUTTONS = "buttons"
+    BUTTON = "button"
+    BUTTONS_DIFF = "buttonsDiff"
     SERVER_INFO = "server"
     HUB_INFO = "network"
     PLAY_IR = "play_ir"
     PLAY_IR_RAW = "play_ir_raw"
+    OPTIONS = "options"
@@ -1,7 +1,6 @@
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ServerInfo:
-    def __init__(self, version: str):
-        self.version = version
+    version: str
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+from pyflichub.event import Event
+
+_LOGGER = logging.getLogger(__name__)
+
+MAX_PENDING_SUBSCRIBER_EVENTS = 100
+
+
+@dataclass(frozen=True)
+class EventFilter:
+    """Matches events by type, button and action. A field that is None matches everything."""
+
+    events: Optional[frozenset[str]] = None
+    bdaddrs: Optional[frozenset[str]] = None
+    actions: Optional[frozenset[str]] = None
+
+    @classmethod
+    def create(
+        cls,
+        events: Optional[Iterable[str]] = None,
+        bdaddrs: Optional[Iterable[str]] = None,
+        actions: Optional[Iterable[str]] = None,
+    ) -> "EventFilter":
+        return cls(
+            frozenset(events) if events is not None else None,
+            frozenset(bdaddrs) if bdaddrs is not None else None,
+            frozenset(actions) if actions is not None else None,
+        )
+
+    def matches(self, event: Event) -> bool:
+        return (
+            (self.events is None or event.event in self.events)
+            and (self.bdaddrs is None or event.button in self.bdaddrs)
+            and (self.actions is None or event.action in self.actions)
+        )
+
+
+class EventSubscription:
+    """
+    Receives the events matching a filter, to be read with async for.
+    Events are kept in a queue of at most max_pending events, when it is full the oldest event is dropped. The
+    iteration ends once the subscription is closed and the queued events have been read.
+    """
+
+    def __init__(
+        self,
+        event_filter: Optional[EventFilter] = None,
+        max_pending: int = MAX_PENDING_SUBSCRIBER_EVENTS,
+        on_close: Optional[Callable[["EventSubscription"], None]] = None,
+    ):
+        self.filter = event_filter or EventFilter()
+        self._max_pending = max_pending
+        self._on_close = on_close
+        self._queue: deque[Event] = deque()
+        self._wakeup = asyncio.Event()
+        self.closed = False
+        self.received = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def put(self, event: Event) -> bool:
+        """Queue the event if it matches the filter. Returns False if it doesn't match or the subscription is closed."""
+        if self.closed or not self.filter.matches(event):
+            return False
+
+        if len(self._queue) >= self._max_pending:
+            self._queue.popleft()
+            self.dropped += 1
+            _LOGGER.debug("Subscriber is too slow, dropped the oldest event")
+        self._queue.append(event)
+        self.received += 1
+        self._wakeup.set()
+        return True
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._wakeup.set()
+        if self._on_close is not None:
+            self._on_close(self)
+
+    def __aiter__(self) -> "EventSubscription":
+        return self
+
+    async def __anext__(self) -> Event:
+        while not self._queue:
+            if self.closed:
+                raise StopAsyncIteration
+            self._wakeup.clear()
+            await self._wakeup.wait()
+        return self._queue.popleft()
+
+    async def __aenter__(self) -> "EventSubscription":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
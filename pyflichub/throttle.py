@@ -0,0 +1,75 @@
+import asyncio
+from typing import Any, Callable, Hashable, Optional
+
+from pyflichub.clock import Clock, MONOTONIC_CLOCK
+
+
+class LatestValueThrottle:
+    """
+    Sends at most one value per key per interval.
+    The first value for a key is sent right away. Values submitted while the key is throttled replace each other, so
+    only the latest one is sent when the interval has passed. The interval is measured and waited out on the clock,
+    which defaults to the monotonic clock.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        send: Callable[[Hashable, Any], None],
+        min_interval: float,
+        clock: Optional[Clock] = None,
+    ):
+        self._loop = loop
+        self._send = send
+        self._min_interval = min_interval
+        self._clock = clock or MONOTONIC_CLOCK
+        self._pending: dict[Hashable, Any] = {}
+        self._timers: dict[Hashable, asyncio.Task] = {}
+        self._last_sent: dict[Hashable, float] = {}
+
+        self.sent = 0
+        self.dropped = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of keys with a value waiting to be sent."""
+        return len(self._pending)
+
+    def submit(self, key: Hashable, value: Any):
+        if key in self._timers:
+            if key in self._pending:
+                self.dropped += 1
+            self._pending[key] = value
+            return
+
+        last_sent = self._last_sent.get(key)
+        now = self._clock.now()
+        if last_sent is None or now - last_sent >= self._min_interval:
+            self._send_now(key, value)
+            return
+
+        self._pending[key] = value
+        self._timers[key] = self._loop.create_task(self._async_send_pending(key, last_sent + self._min_interval - now))
+
+    def flush(self):
+        """Send all pending values right away."""
+        for key in list(self._timers):
+            self._timers.pop(key).cancel()
+            self._send_now(key, self._pending.pop(key))
+
+    def cancel(self):
+        """Drop all pending values."""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._pending.clear()
+
+    async def _async_send_pending(self, key: Hashable, delay: float):
+        await self._clock.sleep(delay)
+        del self._timers[key]
+        self._send_now(key, self._pending.pop(key))
+
+    def _send_now(self, key: Hashable, value: Any):
+        self._last_sent[key] = self._clock.now()
+        self.sent += 1
+        self._send(key, value)
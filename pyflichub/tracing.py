@@ -0,0 +1,91 @@
+import time
+from typing import Callable, Optional, Sequence
+
+from pyflichub.clock import Clock, MONOTONIC_CLOCK
+from pyflichub.histogram import Histogram, LATENCY_BUCKETS
+
+SpanHook = Callable[[str, int, int, dict], None]
+
+
+class EventTrace:
+    """Timestamps of one event on its way from the hub to the event callback, in seconds from the tracer's clock."""
+
+    __slots__ = ("received_at", "received_wall_time", "parsed_at", "dispatched_at", "completed_at")
+
+    def __init__(self, received_at: float, received_wall_time: float):
+        self.received_at = received_at
+        self.received_wall_time = received_wall_time
+        self.parsed_at: Optional[float] = None
+        self.dispatched_at: Optional[float] = None
+        self.completed_at: Optional[float] = None
+
+    def wall_time_ns(self, timestamp: float) -> int:
+        """Convert a clock timestamp of this trace to nanoseconds since the epoch."""
+        return int((self.received_wall_time + timestamp - self.received_at) * 1e9)
+
+
+class EventTracer:
+    """
+    Collects the latency of each stage between a button being pressed and the event callback returning.
+    The transit time from the hub is only measured for hub scripts that stamp events, and is only as accurate as the
+    clocks of the hub and this machine are in sync.
+    If a span hook is given, it is called for each stage with the name, start and end time in nanoseconds since
+    the epoch and the attributes of the span, which maps directly onto an OpenTelemetry span.
+    Stages are timed with the given clock. A client uses its own clock for a tracer that wasn't given one.
+    """
+
+    def __init__(
+        self,
+        on_span: Optional[SpanHook] = None,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        clock: Optional[Clock] = None,
+    ):
+        self._on_span = on_span
+        self.clock = clock
+        self.transit_latency = Histogram(buckets)
+        self.parse_latency = Histogram(buckets)
+        self.dispatch_latency = Histogram(buckets)
+        self.callback_duration = Histogram(buckets)
+
+    def start(self) -> EventTrace:
+        return EventTrace(self.now(), time.time())
+
+    def now(self) -> float:
+        return (self.clock or MONOTONIC_CLOCK).now()
+
+    def finish(self, event, trace: EventTrace):
+        """Record the stages of a traced event once its callback has returned."""
+        transit = None
+        if event.hub_time is not None:
+            transit = max(0.0, trace.received_wall_time - event.hub_time / 1000)
+            self.transit_latency.observe(transit)
+        if trace.parsed_at is not None:
+            self.parse_latency.observe(trace.parsed_at - trace.received_at)
+            if trace.dispatched_at is not None:
+                self.dispatch_latency.observe(trace.dispatched_at - trace.parsed_at)
+                if trace.completed_at is not None:
+                    self.callback_duration.observe(trace.completed_at - trace.dispatched_at)
+
+        if self._on_span is not None:
+            self._emit_spans(event, trace, transit)
+
+    def _emit_spans(self, event, trace: EventTrace, transit: Optional[float]):
+        attributes = {"flichub.event": event.event}
+        if event.button is not None:
+            attributes["flichub.button"] = event.button
+        if event.action is not None:
+            attributes["flichub.action"] = event.action
+
+        received_ns = trace.wall_time_ns(trace.received_at)
+        if transit is not None:
+            self._on_span("flichub.event.transit", min(event.hub_time * 1_000_000, received_ns), received_ns, attributes)
+
+        stages = (
+            ("flichub.event.parse", trace.received_at, trace.parsed_at),
+            ("flichub.event.dispatch", trace.parsed_at, trace.dispatched_at),
+            ("flichub.event.callback", trace.dispatched_at, trace.completed_at),
+        )
+        for name, start, end in stages:
+            if start is None or end is None:
+                break
+            self._on_span(name, trace.wall_time_ns(start), trace.wall_time_ns(end), attributes)
@@ -1,6 +1,10 @@
 import asyncio
-import time
-from typing import Optional, Callable, Dict, Any
+from typing import Optional, Callable, Dict, Any, TYPE_CHECKING
+
+from pyflichub.clock import Clock, MONOTONIC_CLOCK
+
+if TYPE_CHECKING:
+    from pyflichub.twist_scheduler import TickScheduler
 
 
 def clamp(x: float, min_val: float, max_val: float) -> float:
@@ -11,6 +15,58 @@ def sign(x: float) -> int:
     return 1 if x > 0 else (-1 if x < 0 else 0)
 
 
+NOTE_NONE = 0
+NOTE_CENTER_SET = 1
+NOTE_DEADBAND_LATCHED = 2
+NOTE_DEADBAND_ENTER = 3
+NOTE_DETENT = 4
+NOTE_ENTER_FINE_NEUTRAL = 5
+NOTE_ENTER_FINE_TURN = 6
+NOTE_ENTER_FINE_EASE = 7
+NOTE_ENTER_FINE = 8
+NOTE_FINE_MODE_EXIT = 9
+NOTE_FINE_MODE = 10
+
+# The note of each note code, as returned by update_raw
+NOTES = (
+    None,
+    "center set",
+    "deadband (latched)",
+    "deadband (enter)",
+    "detent",
+    "enter fine (neutral)",
+    "enter fine (turn)",
+    "enter fine (ease)",
+    "enter fine",
+    "fine mode (exit)",
+    "fine mode",
+)
+
+
+class DetentResult:
+    """The outcome of RateDetentController.update_raw_fast, with the note as one of the NOTE_ codes."""
+
+    __slots__ = ("intent_changed", "raw_in_pct", "dir", "speed", "fine_mode", "note")
+
+    def __init__(self):
+        self.intent_changed = False
+        self.raw_in_pct = 0.0
+        self.dir = 0
+        self.speed = 0
+        self.fine_mode = False
+        self.note = NOTE_NONE
+
+    @property
+    def note_name(self) -> Optional[str]:
+        return NOTES[self.note]
+
+    def __repr__(self) -> str:
+        return (
+            f"DetentResult(intent_changed={self.intent_changed}, raw_in_pct={self.raw_in_pct}, dir={self.dir}, "
+            f"speed={self.speed}, fine_mode={self.fine_mode}, note={self.note_name!r})"
+        )
+
+
 class RateDetentController:
     """
     Controller for Flic Twist rotation.
@@ -21,14 +77,31 @@ class RateDetentController:
         self,
         cfg: Optional[Dict[str, Any]] = None,
         on_change_callback: Optional[Callable[[Optional[int]], None]] = None,
-        loop: Optional[asyncio.AbstractEventLoop] = None
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        scheduler: Optional["TickScheduler"] = None,
+        clock: Optional[Clock] = None
     ):
+        """
+        If a scheduler is given, the controller is ticked by it while it is moving, instead of by a timer task of
+        its own that keeps running while the controller is idle.
+        Debounce and timeouts are measured with the clock, which defaults to the clock of the scheduler or else the
+        monotonic clock. The timer task of the controller sleeps on the clock too, so a VirtualClock can run it
+        faster than real time. A controller must use the same clock as its scheduler.
+        """
         if cfg is None:
             cfg = {}
+        if scheduler is not None:
+            if clock is None:
+                clock = scheduler.clock
+            elif clock is not scheduler.clock:
+                raise ValueError("A Twist controller must use the same clock as its scheduler")
 
         self.cfg = cfg
         self.on_change_callback = on_change_callback
         self._loop = loop
+        self._scheduler = scheduler
+        self._clock = clock or MONOTONIC_CLOCK
+        self._now_ms = self._clock.now_ms
 
         self.tick_ms = self.cfg.get("tickMs", 333)
 
@@ -71,12 +144,16 @@ class RateDetentController:
         self._ease_candidate_dir = 0
 
         self._last_intent_key = None
+        self._base_dir = 0
+        self._base_speed = 0
+        self._base_desired_speed = 0
+        self._result = DetentResult()
 
         self._running = True
         self._timer_task = None
 
         self.timeout_ms = self.cfg.get("timeoutMs", 500)
-        self._last_raw_time = time.time() * 1000
+        self._last_raw_time = self._now_ms()
         self._last_raw_in_pct = None
 
     def _desired_speed(self, abs_off: float) -> int:
@@ -111,12 +188,14 @@ class RateDetentController:
             if abs_off <= (self.tier2_max_off - self.tier_hys):
                 self.speed_latched = 2
 
-    def _base_intent(self, raw_in_pct: float) -> dict:
+    def _base_intent(self, raw_in_pct: float) -> int:
+        """Set the base direction, speed and desired speed for a raw position and return the reason as a note code."""
         if self.center_in_pct is None:
             self.center_in_pct = raw_in_pct
             self.neutral_latched = True
             self.speed_latched = 0
-            return {"dir": 0, "speed": 0, "desiredSpeed": 0, "reason": "center set"}
+            self._base_dir = self._base_speed = self._base_desired_speed = 0
+            return NOTE_CENTER_SET
 
         off = raw_in_pct - self.center_in_pct
         abs_off = abs(off)
@@ -127,26 +206,29 @@ class RateDetentController:
                 # soft recenter while resting
                 self.center_in_pct = self.center_in_pct + self.neutral_recenter_alpha * (raw_in_pct - self.center_in_pct)
                 self.speed_latched = 0
-                return {"dir": 0, "speed": 0, "desiredSpeed": 0, "reason": "deadband (latched)"}
+                self._base_dir = self._base_speed = self._base_desired_speed = 0
+                return NOTE_DEADBAND_LATCHED
             self.neutral_latched = False
         else:
             if abs_off <= self.deadband_enter:
                 self.neutral_latched = True
                 self.speed_latched = 0
-                return {"dir": 0, "speed": 0, "desiredSpeed": 0, "reason": "deadband (enter)"}
+                self._base_dir = self._base_speed = self._base_desired_speed = 0
+                return NOTE_DEADBAND_ENTER
 
-        dir_val = sign(off)
         desired_speed = self._desired_speed(abs_off)
         self._update_latched_speed(desired_speed, abs_off)
 
-        speed = 1 if self.speed_latched == 0 else self.speed_latched
-        return {"dir": dir_val, "speed": speed, "desiredSpeed": desired_speed, "reason": "detent"}
+        self._base_dir = sign(off)
+        self._base_speed = 1 if self.speed_latched == 0 else self.speed_latched
+        self._base_desired_speed = desired_speed
+        return NOTE_DETENT
 
-    def _apply_fine_mode(self, base: dict) -> dict:
-        dir_val = base["dir"]
-        speed = base["speed"]
-        desired_speed = base["desiredSpeed"]
-        now = time.time() * 1000  # ms
+    def _apply_fine_mode(self, now: float) -> int:
+        """Set the current direction and speed from the base intent and return a note code, or NOTE_NONE."""
+        dir_val = self._base_dir
+        speed = self._base_speed
+        desired_speed = self._base_desired_speed
 
         direction_changed = (self.last_dir != 0 and dir_val != 0 and dir_val != self.last_dir)
         hit_neutral_from_intent = (self.last_speed > 0 and speed == 0)
@@ -178,28 +260,77 @@ class RateDetentController:
 
             if speed == 0:
                 self.fine_mode = False
-                return {"dir": 0, "speed": 0, "note": "enter fine (neutral)"}
+                self.current_dir = self.current_speed = 0
+                return NOTE_ENTER_FINE_NEUTRAL
+            self.current_dir = dir_val
+            self.current_speed = 1
             if direction_changed:
-                return {"dir": dir_val, "speed": 1, "note": "enter fine (turn)"}
+                return NOTE_ENTER_FINE_TURN
             if eased_confirmed:
-                return {"dir": dir_val, "speed": 1, "note": "enter fine (ease)"}
-            return {"dir": dir_val, "speed": 1, "note": "enter fine"}
+                return NOTE_ENTER_FINE_EASE
+            return NOTE_ENTER_FINE
 
         if self.fine_mode:
             if speed == 0:
                 self.fine_mode = False
-                return {"dir": 0, "speed": 0, "note": "fine mode (exit)"}
-            return {"dir": dir_val, "speed": 1, "note": "fine mode"}
+                self.current_dir = self.current_speed = 0
+                return NOTE_FINE_MODE_EXIT
+            self.current_dir = dir_val
+            self.current_speed = 1
+            return NOTE_FINE_MODE
+
+        self.current_dir = dir_val
+        self.current_speed = speed
+        return NOTE_NONE
+
+    def update_raw(self, raw_in_pct: float, now_ms: Optional[float] = None) -> Optional[dict]:
+        """Process a raw position. now_ms is the time of the sample in ms, and defaults to the time of the clock."""
+        if not isinstance(raw_in_pct, (int, float)):
+            return None
 
-        return {"dir": dir_val, "speed": speed, "note": None}
+        if self._scheduler is None:
+            self._ensure_timer()
+        note, intent_changed = self._update(raw_in_pct, self._now_ms() if now_ms is None else now_ms)
+        if self._scheduler is not None:
+            self._wake_scheduler()
+        return {
+            "intentChanged": intent_changed,
+            "rawInPct": raw_in_pct,
+            "dir": self.current_dir,
+            "speed": self.current_speed,
+            "fineMode": self.fine_mode,
+            "note": NOTES[note]
+        }
 
-    def update_raw(self, raw_in_pct: float) -> Optional[dict]:
+    def update_raw_fast(self, raw_in_pct: float, now_ms: Optional[float] = None) -> Optional["DetentResult"]:
+        """
+        Same as update_raw, but the result is a DetentResult with an integer note code instead of a dict.
+        The result object belongs to the controller and is overwritten by the next call, copy what you need to keep.
+        """
         if not isinstance(raw_in_pct, (int, float)):
             return None
 
-        self._last_raw_time = time.time() * 1000
-        self._last_raw_in_pct = raw_in_pct
-
+        if self._scheduler is not None:
+            note, intent_changed = self._update(raw_in_pct, self._now_ms() if now_ms is None else now_ms)
+            self._wake_scheduler()
+        else:
+            if self._timer_task is None:
+                self._ensure_timer()
+            note, intent_changed = self._update(raw_in_pct, self._now_ms() if now_ms is None else now_ms)
+        result = self._result
+        result.intent_changed = intent_changed
+        result.raw_in_pct = raw_in_pct
+        result.dir = self.current_dir
+        result.speed = self.current_speed
+        result.fine_mode = self.fine_mode
+        result.note = note
+        return result
+
+    def _wake_scheduler(self):
+        if self._running and self.current_dir != 0 and self.current_speed != 0:
+            self._scheduler.wake(self)
+
+    def _ensure_timer(self):
         if self._timer_task is None and self._running:
             try:
                 loop = asyncio.get_running_loop()
@@ -210,46 +341,38 @@ class RateDetentController:
                 else:
                     self._timer_task = asyncio.get_event_loop().create_task(self._tick_loop())
 
+    def _update(self, raw_in_pct: float, now_ms: float) -> tuple[int, bool]:
+        """Process a raw position at the given time and return its note code and whether the intent changed."""
+        self._last_raw_time = now_ms
+        self._last_raw_in_pct = raw_in_pct
+
         if self.actual_out_pct is None:
             self.actual_out_pct = self.min_out_pct
         if self.center_in_pct is None:
             self.center_in_pct = raw_in_pct
 
-        base = self._base_intent(raw_in_pct)
-        applied = self._apply_fine_mode(base)
-
-        self.current_dir = applied["dir"]
-        self.current_speed = applied["speed"]
-
-        note = applied["note"] or base.get("reason") or None
-
-        key = f"{self.current_dir}|{self.current_speed}|{'F' if self.fine_mode else '-'}|{'N' if self.neutral_latched else '-'}|{note or ''}"
+        reason = self._base_intent(raw_in_pct)
+        note = self._apply_fine_mode(now_ms) or reason
 
+        key = (self.current_dir, self.current_speed, self.fine_mode, self.neutral_latched, note)
         intent_changed = (key != self._last_intent_key)
         self._last_intent_key = key
 
         self.last_dir = self.current_dir
         self.last_speed = self.current_speed
-
-        return {
-            "intentChanged": intent_changed,
-            "rawInPct": raw_in_pct,
-            "dir": self.current_dir,
-            "speed": self.current_speed,
-            "fineMode": self.fine_mode,
-            "note": note
-        }
+        return note, intent_changed
 
     async def _tick_loop(self):
         while self._running:
-            await asyncio.sleep(self.tick_ms / 1000.0)
+            await self._clock.sleep(self.tick_ms / 1000.0)
             self._tick()
 
-    def _tick(self):
+    def _tick(self, now: Optional[float] = None):
         if self.actual_out_pct is None:
             return
 
-        now = time.time() * 1000
+        if now is None:
+            now = self._now_ms()
         if self.timeout_ms and (now - self._last_raw_time) > self.timeout_ms:
             if self.current_dir != 0 or self.current_speed != 0:
                 self.current_dir = 0
@@ -278,6 +401,8 @@ class RateDetentController:
 
     def stop(self) -> Optional[int]:
         self._running = False
+        if self._scheduler is not None:
+            self._scheduler.remove(self)
         if self._timer_task:
             self._timer_task.cancel()
             self._timer_task = None
@@ -0,0 +1,114 @@
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Any, Optional, Sequence
+
+from pyflichub.twist_controller import NOTES, RateDetentController
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+@dataclass(slots=True)
+class ReplayResult:
+    """
+    The intent and output of a controller after each replayed sample.
+    All fields are NumPy arrays when NumPy is installed and lists otherwise, except note which is always a list.
+    """
+
+    timestamps: Any
+    raw_in_pct: Any
+    dir: Any
+    speed: Any
+    fine_mode: Any
+    intent_changed: Any
+    note: list[Optional[str]]
+    out_pct: Any
+
+    def __len__(self) -> int:
+        return len(self.note)
+
+
+def replay(controller: RateDetentController, samples: Sequence[tuple[float, float]]) -> ReplayResult:
+    """
+    Feed recorded (timestamp in ms, raw_in_pct) samples through a controller and return its state after each one.
+    The controller is ticked every tick_ms from the first sample, like its timer would, and a tick that is due at
+    the time of a sample runs before the sample. The results are the same as feeding the samples one by one to
+    update_raw with now_ms and ticking in between, but no timer is started and ticks that can't change anything
+    are skipped. Use a new controller for each replay, as its state carries over.
+    """
+    timestamps, raw_in_pct = _split_samples(samples)
+    count = len(timestamps)
+    dirs = [0] * count
+    speeds = [0] * count
+    fine_modes = [False] * count
+    intents_changed = [False] * count
+    notes: list[Optional[str]] = [None] * count
+    out_pcts = [0] * count
+
+    if count:
+        ticks_before = _ticks_before(timestamps, controller.tick_ms)
+        times = timestamps.tolist() if np is not None else timestamps
+        raws = raw_in_pct.tolist() if np is not None else raw_in_pct
+        first = times[0]
+        tick_ms = controller.tick_ms
+        ticks_done = 0
+        update = controller._update
+        tick = controller._tick
+
+        for index, (now, raw, due) in enumerate(zip(times, raws, ticks_before)):
+            if due > ticks_done:
+                # Ticks only move the output while there is a direction and speed, and once the timeout has
+                # stopped the controller the remaining ticks up to this sample do nothing either
+                while ticks_done < due and controller.current_dir != 0 and controller.current_speed != 0:
+                    ticks_done += 1
+                    tick(first + ticks_done * tick_ms)
+                ticks_done = due
+
+            note, intent_changed = update(raw, now)
+            dirs[index] = controller.current_dir
+            speeds[index] = controller.current_speed
+            fine_modes[index] = controller.fine_mode
+            intents_changed[index] = intent_changed
+            notes[index] = NOTES[note]
+            out_pcts[index] = controller.get_actual_out_pct()
+
+    if np is not None:
+        return ReplayResult(
+            timestamps=timestamps,
+            raw_in_pct=raw_in_pct,
+            dir=np.array(dirs, dtype=np.int8),
+            speed=np.array(speeds, dtype=np.int8),
+            fine_mode=np.array(fine_modes, dtype=bool),
+            intent_changed=np.array(intents_changed, dtype=bool),
+            note=notes,
+            out_pct=np.array(out_pcts, dtype=np.int64),
+        )
+    return ReplayResult(timestamps, raw_in_pct, dirs, speeds, fine_modes, intents_changed, notes, out_pcts)
+
+
+def _split_samples(samples) -> tuple[Any, Any]:
+    if np is not None:
+        array = np.asarray(samples, dtype=np.float64).reshape(-1, 2)
+        if array.size and not np.all(np.diff(array[:, 0]) >= 0):
+            raise ValueError("Sample timestamps must not decrease")
+        return array[:, 0], array[:, 1]
+
+    timestamps = [float(timestamp) for timestamp, _ in samples]
+    raw_in_pct = [float(raw) for _, raw in samples]
+    if any(later < earlier for earlier, later in zip(timestamps, timestamps[1:])):
+        raise ValueError("Sample timestamps must not decrease")
+    return timestamps, raw_in_pct
+
+
+def _ticks_before(timestamps, tick_ms: float):
+    """Number of ticks at first + k * tick_ms that are due at or before each timestamp."""
+    first = float(timestamps[0])
+    last_tick = int((float(timestamps[-1]) - first) // tick_ms) + 1
+    if np is not None:
+        tick_times = first + np.arange(1, last_tick + 1, dtype=np.float64) * tick_ms
+        return np.searchsorted(tick_times, timestamps, side="right").tolist()
+
+    tick_times = [first + k * tick_ms for k in range(1, last_tick + 1)]
+    return [bisect_right(tick_times, timestamp) for timestamp in timestamps]
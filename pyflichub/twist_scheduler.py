@@ -0,0 +1,145 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from typing import Optional, TYPE_CHECKING
+
+from pyflichub.clock import Clock, MONOTONIC_CLOCK
+
+if TYPE_CHECKING:
+    from pyflichub.twist_controller import RateDetentController
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TickScheduler:
+    """
+    Ticks any number of RateDetentControllers from a single timer on the event loop.
+    A controller is only scheduled while it has a direction and speed, because ticks do nothing otherwise. It is
+    parked after the tick that finds it idle, for example once its timeout has neutralized it, and woken up again
+    by the next update_raw that gives it a direction.
+    The timer sleeps on the clock, which defaults to the monotonic clock. Controllers without a clock of their own
+    use the clock of their scheduler, so a VirtualClock runs all of them faster than real time.
+    """
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None, clock: Optional[Clock] = None):
+        self._loop = loop
+        self.clock = clock or MONOTONIC_CLOCK
+        self._due: list[tuple[float, int, "RateDetentController"]] = []
+        self._active: dict["RateDetentController", int] = {}
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.Task] = None
+        self._timer_at: Optional[float] = None
+        self._ticking = False
+
+        self.ticks = 0
+        self.wakeups = 0
+        self.parks = 0
+
+    @property
+    def active(self) -> int:
+        """Number of controllers that are being ticked."""
+        return len(self._active)
+
+    def wake(self, controller: "RateDetentController"):
+        """Start ticking a controller, unless it is already being ticked. Can be called from any thread."""
+        if controller in self._active:
+            return
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if self._loop is None:
+            if running is None:
+                raise RuntimeError("TickScheduler needs an event loop")
+            self._loop = running
+
+        if running is self._loop:
+            self._schedule(controller)
+        else:
+            self._loop.call_soon_threadsafe(self._schedule, controller)
+
+    def remove(self, controller: "RateDetentController"):
+        """Stop ticking a controller."""
+        if self._active.pop(controller, None) is not None:
+            self._arm()
+
+    def close(self):
+        self._active.clear()
+        self._due.clear()
+        self._arm()
+
+    def _schedule(self, controller: "RateDetentController"):
+        if controller in self._active:
+            return
+
+        sequence = next(self._sequence)
+        self._active[controller] = sequence
+        heapq.heappush(self._due, (self.clock.now() + controller.tick_ms / 1000.0, sequence, controller))
+        self.wakeups += 1
+        self._arm()
+
+    def _next_due(self) -> Optional[float]:
+        due = self._due
+        # Drop the entries of controllers that were removed since they were scheduled
+        while due and self._active.get(due[0][2]) != due[0][1]:
+            heapq.heappop(due)
+        return due[0][0] if due else None
+
+    def _arm(self):
+        """Make the timer fire when the first controller is due."""
+        if self._ticking:
+            # The timer picks the next due controller itself once the current ticks are done
+            return
+
+        when = self._next_due()
+        if when is None:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = self._timer_at = None
+            return
+
+        if self._timer is not None:
+            if self._timer_at <= when:
+                return
+            self._timer.cancel()
+        self._timer_at = when
+        self._timer = self._loop.create_task(self._async_timer())
+
+    async def _async_timer(self):
+        while self._timer_at is not None:
+            await self.clock.sleep(max(0.0, self._timer_at - self.clock.now()))
+            self._ticking = True
+            try:
+                # A clock that counts in whole nanoseconds may wake up a hair before the due time
+                self._run(max(self.clock.now(), self._timer_at))
+            finally:
+                self._ticking = False
+            self._timer_at = self._next_due()
+        self._timer = None
+
+    def _run(self, now: float):
+        due = self._due
+        while due and due[0][0] <= now:
+            when, sequence, controller = heapq.heappop(due)
+            if self._active.get(controller) != sequence:
+                continue
+
+            try:
+                controller._tick()
+            except Exception:
+                _LOGGER.exception("Error while ticking a Twist controller")
+            self.ticks += 1
+
+            if controller.current_dir == 0 or controller.current_speed == 0:
+                del self._active[controller]
+                self.parks += 1
+            else:
+                interval = controller.tick_ms / 1000.0
+                next_at = when + interval
+                if next_at <= now:
+                    # Don't catch up on ticks missed while the loop was busy
+                    next_at = now + interval
+                heapq.heappush(due, (next_at, sequence, controller))
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Hashable, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+MAX_PENDING_LINES = 10000
+
+
+class OutboundQueue:
+    """
+    Queues outgoing lines and writes them to the transport in one writelines call per event loop iteration.
+    Writing is held back while the transport asks the protocol to pause writing. on_written is called with the
+    number of lines and bytes after each write to the transport.
+    Lines can be tagged with their command and key, so lines that were never written can be handed to the offline
+    buffer when the connection is lost.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        get_transport: Callable[[], Optional[asyncio.WriteTransport]],
+        max_pending_lines: int = MAX_PENDING_LINES,
+        on_written: Optional[Callable[[int, int], None]] = None,
+    ):
+        self._loop = loop
+        self._get_transport = get_transport
+        self._on_written = on_written
+        self._lines: deque[tuple[bytes, Optional[str], Hashable]] = deque()
+        self._max_pending_lines = max_pending_lines
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self._paused = False
+
+        self.max_depth = 0
+        self.lines_written = 0
+        self.bytes_written = 0
+        self.lines_dropped = 0
+        self.flushes = 0
+
+    @property
+    def depth(self) -> int:
+        """Number of lines waiting to be written."""
+        return len(self._lines)
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    def put(self, line: bytes, command: Optional[str] = None, key: Hashable = None):
+        if len(self._lines) >= self._max_pending_lines:
+            self._lines.popleft()
+            self.lines_dropped += 1
+            _LOGGER.warning("Outbound queue is full, dropped the oldest line")
+
+        self._lines.append((line, command, key))
+        if len(self._lines) > self.max_depth:
+            self.max_depth = len(self._lines)
+
+        if self._flush_handle is None and not self._paused:
+            self._flush_handle = self._loop.call_soon(self.flush)
+
+    def flush(self):
+        """Write all queued lines to the transport."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        transport = self._get_transport()
+        if self._paused or transport is None or not self._lines:
+            return
+
+        lines = [line for line, _, _ in self._lines]
+        self._lines.clear()
+        transport.writelines(lines)
+
+        written = sum(map(len, lines))
+        self.flushes += 1
+        self.lines_written += len(lines)
+        self.bytes_written += written
+        if self._on_written is not None:
+            self._on_written(len(lines), written)
+
+    def pause(self):
+        self._paused = True
+
+    def resume(self):
+        self._paused = False
+        self.flush()
+
+    def take_unwritten(self) -> list[tuple[bytes, Optional[str], Hashable]]:
+        """Remove and return the queued lines with their command and key, oldest first."""
+        unwritten = list(self._lines)
+        self.clear()
+        return unwritten
+
+    def clear(self):
+        """Drop all queued lines."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._lines.clear()
+        self._paused = False
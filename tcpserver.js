@@ -6,7 +6,7 @@ const buttons = require('buttons');
 const flicapp = require('flicapp');
 const ir = require('ir');
 const EOL = "\n";
-const VERSION = "0.1.12";
+const VERSION = "0.1.13";
 
 // Configuration - start
 const HOST = "0.0.0.0";
@@ -15,11 +15,23 @@ const EVENT_BUTTON = "button";
 // Configuration - end
 
 net.createServer(function (socket) {
+    var stampEvents = false;
+
     function write(_payload) {
+        if (stampEvents && _payload.event !== undefined) {
+            _payload['hub_time'] = Date.now();
+        }
         socket.write(JSON.stringify(_payload) + EOL)
     }
 
-    function sendButtons() {
+    function reply(_payload, requestId) {
+        if (requestId !== undefined) {
+            _payload['request_id'] = requestId;
+        }
+        write(_payload)
+    }
+
+    function sendButtons(requestId) {
         const _buttons = buttons.getButtons();
         console.log(JSON.stringify(_buttons))
 
@@ -28,10 +40,46 @@ net.createServer(function (socket) {
             'data': _buttons
         };
 
-        write(payload)
+        reply(payload, requestId)
+    }
+
+    function sendButtonDetails(bdaddrs, requestId) {
+        const wanted = bdaddrs || [];
+        const _buttons = buttons.getButtons().filter(function (button) {
+            return wanted.indexOf(button.bdaddr) !== -1;
+        });
+
+        const payload = {
+            'command': 'button',
+            'data': _buttons
+        };
+
+        reply(payload, requestId)
     }
 
-    function sendNetworkInfo() {
+    function sendButtonsDiff(known, requestId) {
+        const _known = known || [];
+        const _buttons = buttons.getButtons();
+        const current = _buttons.map(function (button) {
+            return button.bdaddr;
+        });
+
+        const payload = {
+            'command': 'buttonsDiff',
+            'data': {
+                'added': _buttons.filter(function (button) {
+                    return _known.indexOf(button.bdaddr) === -1;
+                }),
+                'removed': _known.filter(function (bdaddr) {
+                    return current.indexOf(bdaddr) === -1;
+                })
+            }
+        };
+
+        reply(payload, requestId)
+    }
+
+    function sendNetworkInfo(requestId) {
         const _network = network.getState();
         console.log(JSON.stringify(_network))
 
@@ -40,10 +88,10 @@ net.createServer(function (socket) {
             'data': _network
         };
 
-        write(payload)
+        reply(payload, requestId)
     }
 
-    function sendServerInfo() {
+    function sendServerInfo(requestId) {
         const payload = {
             'command': 'server',
             'data': {
@@ -51,7 +99,7 @@ net.createServer(function (socket) {
             }
         };
 
-        write(payload)
+        reply(payload, requestId)
     }
 
     console.log("Connection from " + socket.remoteAddress);
@@ -169,6 +217,38 @@ net.createServer(function (socket) {
         socket.destroy();
     });
 
+    function handleRequest(command, requestId, params) {
+        const _params = params || {};
+        switch (command) {
+            case "buttons":
+                sendButtons(requestId);
+                return true;
+            case "button":
+                sendButtonDetails(_params.bdaddrs, requestId);
+                return true;
+            case "buttonsDiff":
+                sendButtonsDiff(_params.known, requestId);
+                return true;
+            case "network":
+                sendNetworkInfo(requestId);
+                return true;
+            case "server":
+                sendServerInfo(requestId);
+                return true;
+            case "options":
+                if (_params.event_timestamps !== undefined) {
+                    stampEvents = _params.event_timestamps === true;
+                }
+                reply({'command': 'options', 'data': {'event_timestamps': stampEvents}}, requestId);
+                return true;
+            case "ping":
+                write("pong")
+                return true;
+            default:
+                return false;
+        }
+    }
+
     socket.on('data', function (data) {
         data.trim().split(EOL).forEach(function (msg) {
             console.log("Received message: " + msg)
@@ -176,6 +256,9 @@ net.createServer(function (socket) {
             if (msg.startsWith("{")) {
                 try {
                     const parsed = JSON.parse(msg);
+                    if (handleRequest(parsed.command, parsed.request_id, parsed)) {
+                        return;
+                    }
                     if (parsed.command === "virtualDeviceUpdateState") {
                         flicapp.virtualDeviceUpdateState(parsed.dimmableType, parsed.virtualDeviceId, parsed.values);
                     }
@@ -203,21 +286,8 @@ net.createServer(function (socket) {
                 return;
             }
 
-            switch (msg) {
-                case "buttons":
-                    sendButtons();
-                    break;
-                case "network":
-                    sendNetworkInfo();
-                    break;
-                case "server":
-                    sendServerInfo();
-                    break;
-                case "ping":
-                    write("pong")
-                    break;
-                default:
-                    console.error("Unknown command: " + msg)
+            if (!handleRequest(msg)) {
+                console.error("Unknown command: " + msg)
             }
         });
     });
@@ -0,0 +1,50 @@
+import pytest
+
+from pyflichub.button import FlicButton
+from pyflichub.button_store import ButtonStore
+
+
+def _button(bdaddr, name, uuid=None, serial_number=None):
+    return FlicButton(
+        bdaddr, serial_number or f"sn-{name}", "black", name, False, True, True, 100, uuid or f"uuid-{name}", 2, 1,
+        "key", False
+    )
+
+
+def test_add_replaces_button_with_same_bdaddr():
+    store = ButtonStore([_button("aa:bb:cc", "one"), _button("dd:ee:ff", "two")])
+    replacement = _button("aa:bb:cc", "renamed", uuid="uuid-new")
+
+    store.add(replacement)
+    assert len(store) == 2
+    assert [button.name for button in store.as_list()] == ["two", "renamed"]
+    assert store.get("aa:bb:cc") is replacement
+    assert store.get_by_uuid("uuid-one") is None
+    assert store.get_by_uuid("uuid-new") is replacement
+    assert store.get_by_serial_number("sn-one") is None
+
+
+def test_as_list_returns_a_copy():
+    store = ButtonStore([_button("aa:bb:cc", "one")])
+    buttons = store.as_list()
+    buttons.clear()
+    assert [button.name for button in store.as_list()] == ["one"]
+
+    store.remove(store.get("aa:bb:cc"))
+    assert store.as_list() == []
+    assert "aa:bb:cc" not in store
+
+
+def test_replace_all_with_no_buttons():
+    store = ButtonStore([_button("aa:bb:cc", "one")])
+    assert len(store.as_list()) == 1
+
+    store.replace_all([])
+    assert store.as_list() == []
+    assert store.get("aa:bb:cc") is None
+    assert store.get_by_uuid("uuid-one") is None
+
+
+def test_store_has_no_instance_dict():
+    with pytest.raises(AttributeError):
+        ButtonStore().__dict__
@@ -0,0 +1,42 @@
+from unittest.mock import patch
+
+from pyflichub.cache import CommandCache
+from pyflichub.command import Command
+from pyflichub.server_command import ServerCommand
+
+
+@patch("pyflichub.cache.time.monotonic")
+def test_cache_expires(mock_monotonic):
+    mock_monotonic.return_value = 100.0
+    cache = CommandCache({ServerCommand.SERVER_INFO: 10.0})
+    command = Command(ServerCommand.SERVER_INFO, None)
+
+    assert cache.get(ServerCommand.SERVER_INFO) is None
+    cache.set(ServerCommand.SERVER_INFO, command)
+    mock_monotonic.return_value = 109.0
+    assert cache.get(ServerCommand.SERVER_INFO) is command
+    mock_monotonic.return_value = 110.0
+    assert cache.get(ServerCommand.SERVER_INFO) is None
+
+    assert cache.hits[ServerCommand.SERVER_INFO] == 1
+    assert cache.misses[ServerCommand.SERVER_INFO] == 2
+
+
+def test_cache_disabled_for_zero_ttl():
+    cache = CommandCache({ServerCommand.HUB_INFO: 0})
+    cache.set(ServerCommand.HUB_INFO, Command(ServerCommand.HUB_INFO, None))
+    assert cache.get(ServerCommand.HUB_INFO) is None
+    assert cache.misses[ServerCommand.HUB_INFO] == 0
+
+
+def test_cache_invalidate():
+    cache = CommandCache({ServerCommand.BUTTONS: 10.0})
+    cache.set(ServerCommand.BUTTONS, Command(ServerCommand.BUTTONS, []))
+    cache.set(ServerCommand.SERVER_INFO, Command(ServerCommand.SERVER_INFO, None))
+
+    cache.invalidate(ServerCommand.BUTTONS)
+    assert cache.get(ServerCommand.BUTTONS) is None
+    assert cache.get(ServerCommand.SERVER_INFO) is not None
+
+    cache.invalidate()
+    assert cache.get(ServerCommand.SERVER_INFO) is None
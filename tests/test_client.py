@@ -2,7 +2,8 @@ import asyncio
 import json
 import logging
 import pytest
-from pyflichub.client import FlicHubTcpClient
+from unittest.mock import MagicMock
+from pyflichub.client import FlicHubTcpClient, REQUEST_ID_MIN_HUB_VERSION
 from pyflichub.command import Command
 from pyflichub.event import Event
 
@@ -10,8 +11,8 @@ logging.basicConfig(level=logging.DEBUG)
 
 
 class DummyClient(FlicHubTcpClient):
-    def __init__(self):
-        super().__init__("127.0.0.1", 8124, asyncio.new_event_loop())
+    def __init__(self, **kwargs):
+        super().__init__("127.0.0.1", 8124, asyncio.new_event_loop(), **kwargs)
         self.events_received = []
         self.commands_received = []
 
@@ -60,6 +61,33 @@ def test_data_received_multiple_messages():
     assert client._buffer == b""
 
 
+def test_data_received_line_split_across_chunks():
+    client = DummyClient()
+    client.data_received(b'{"event": "button", "butt')
+    client.data_received(b'on": "aa:bb:cc", "action": "down"}\n{"event": "button", ')
+    assert len(client.events_received) == 1
+    assert client._buffer == b'{"event": "button", '
+
+    client.data_received(b'"button": "aa:bb:cc", "action": "up"}\n')
+    assert [event.action for event in client.events_received] == ["down", "up"]
+    assert client._buffer == b""
+
+
+def test_data_received_max_line_length():
+    client = DummyClient(max_line_length=64)
+    long_line = b'{"event": "button", "button": "' + b"a" * 100 + b'"}'
+
+    client.data_received(long_line + b'\n{"event": "buttonReady", "button": "aa:bb:cc"}\n')
+    assert [event.event for event in client.events_received] == ["buttonReady"]
+
+    # An overlong partial line is discarded up to and including its newline
+    client.data_received(long_line[:70])
+    assert client._buffer == b""
+    client.data_received(long_line[70:] + b'\n{"event": "buttonConnected", "button": "aa:bb:cc"}\n')
+    assert [event.event for event in client.events_received] == ["buttonReady", "buttonConnected"]
+    assert client._buffer == b""
+
+
 def test_data_received_pong():
     client = DummyClient()
     client.data_received(b"pong\n")
@@ -180,10 +208,11 @@ def test_play_ir():
     client = DummyClient()
     client._transport = MagicMock()
     client.play_ir("test_signal")
+    client.write_queue.flush()
 
     expected_payload = json.dumps({"command": "play_ir", "signal_id": "test_signal"}) + "\n"
 
-    client._transport.write.assert_called_once_with(expected_payload.encode())
+    client._transport.writelines.assert_called_once_with([expected_payload.encode()])
 
 
 def test_play_ir_raw():
@@ -194,10 +223,11 @@ def test_play_ir_raw():
 
     test_arr = [38000, 9000, 4500, 560, 560]
     client.play_ir_raw(test_arr)
+    client.write_queue.flush()
 
     expected_payload = json.dumps({"command": "play_ir_raw", "arr": test_arr}) + "\n"
 
-    client._transport.write.assert_called_once_with(expected_payload.encode())
+    client._transport.writelines.assert_called_once_with([expected_payload.encode()])
 
 
 def test_data_received_invalid_json():
@@ -206,3 +236,648 @@ def test_data_received_invalid_json():
     assert len(client.events_received) == 0
     assert len(client.commands_received) == 0
     assert client._buffer == b""
+
+
+def test_button_lookup_index():
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.new_event_loop())
+
+    client.data_received(
+        b'{"command": "buttons", "data": ['
+        b'{"bdaddr": "aa:bb:cc", "serialNumber": "sn1", "color": "black", "name": "one", "activeDisconnect": false,'
+        b' "connected": true, "ready": true, "batteryStatus": 100, "uuid": "uuid1", "flicVersion": 2,'
+        b' "firmwareVersion": 1, "key": "key", "passiveMode": false},'
+        b'{"bdaddr": "dd:ee:ff", "serialNumber": "sn2", "color": "white", "name": "two", "activeDisconnect": false,'
+        b' "connected": true, "ready": true, "batteryStatus": 100, "uuid": "uuid2", "flicVersion": 2,'
+        b' "firmwareVersion": 1, "key": "key", "passiveMode": false}]}\n'
+    )
+    assert len(client.buttons) == 2
+    assert client.get_button("aa:bb:cc").name == "one"
+    assert client.get_button_by_uuid("uuid2").name == "two"
+    assert client.get_button_by_serial_number("sn1").name == "one"
+    assert client.get_button("00:00:00") is None
+
+    client.data_received(b'{"event": "buttonDeleted", "button": "aa:bb:cc"}\n')
+    assert [button.name for button in client.buttons] == ["two"]
+    assert client.get_button("aa:bb:cc") is None
+    assert client.get_button_by_uuid("uuid1") is None
+    assert client.get_button_by_serial_number("sn1") is None
+
+    client.data_received(b'{"command": "buttons", "data": []}\n')
+    assert client.buttons == []
+    assert client.get_button("dd:ee:ff") is None
+
+
+def test_server_and_network_info():
+    commands_received = []
+    client = FlicHubTcpClient(
+        "127.0.0.1", 8124, asyncio.new_event_loop(), command_callback=commands_received.append
+    )
+
+    client.data_received(b'{"command": "server", "data": {"version": "0.1.12"}}\n')
+    client.data_received(
+        b'{"command": "network", "data": {"dhcp": {"wifi": {"connected": true, "ip": "192.168.1.2",'
+        b' "mac": "aa:bb"}}, "wifiState": {"state": "connected", "ssid": [104, 111, 109, 101]}}}\n'
+    )
+    assert commands_received[0].data.version == "0.1.12"
+    network = commands_received[1].data
+    assert network.has_wifi() and not network.has_ethernet()
+    assert network.wifi.ip == "192.168.1.2"
+    assert network.wifi.ssid == "home"
+
+
+class FakeTransport:
+    def __init__(self):
+        self.written = []
+
+    def write(self, data):
+        self.written.append(data)
+
+    def writelines(self, lines):
+        self.written.extend(lines)
+
+    def close(self):
+        pass
+
+
+def _attach_transport(client):
+    client._transport = FakeTransport()
+    return client._transport
+
+
+async def _run_pending_tasks():
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_resolved_by_request_id():
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.get_running_loop())
+    transport = _attach_transport(client)
+    client._hub_version = "0.1.13"
+
+    first = asyncio.ensure_future(client._async_send_command_and_wait_for_data("server"))
+    second = asyncio.ensure_future(client._async_send_command_and_wait_for_data("server"))
+    await _run_pending_tasks()
+    assert [json.loads(data) for data in transport.written] == [
+        {"command": "server", "request_id": 1},
+        {"command": "server", "request_id": 2},
+    ]
+
+    # Replies arrive out of order
+    client.data_received(b'{"command": "server", "data": {"version": "2.0.0"}, "request_id": 2}\n')
+    client.data_received(b'{"command": "server", "data": {"version": "1.0.0"}, "request_id": 1}\n')
+    assert (await first).data.version == "1.0.0"
+    assert (await second).data.version == "2.0.0"
+    assert client._requests == {}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_without_request_ids():
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.get_running_loop())
+    transport = _attach_transport(client)
+
+    server_info = asyncio.ensure_future(client._async_send_command_and_wait_for_data("server"))
+    buttons = asyncio.ensure_future(client._async_send_command_and_wait_for_data("buttons"))
+    third = asyncio.ensure_future(client._async_send_command_and_wait_for_data("server"))
+    await _run_pending_tasks()
+    assert transport.written == [b"server\n", b"buttons\n", b"server\n"]
+
+    client.data_received(
+        b'{"command": "server", "data": {"version": "0.1.12"}}\n'
+        b'{"command": "buttons", "data": []}\n'
+        b'{"command": "server", "data": {"version": "0.1.13"}}\n'
+    )
+    assert (await server_info).data.version == "0.1.12"
+    assert (await buttons).data == []
+    assert (await third).data.version == "0.1.13"
+
+    # The hub script echoes request ids from version 0.1.13
+    assert client._hub_supports(REQUEST_ID_MIN_HUB_VERSION)
+
+
+@pytest.mark.asyncio
+async def test_pending_requests_resolved_on_connection_lost():
+    loop = asyncio.get_running_loop()
+    client = FlicHubTcpClient("127.0.0.1", 8124, loop)
+    _attach_transport(client)
+    client._async_connect = mock_async_connect = MagicMock(return_value=asyncio.sleep(0))
+
+    buttons = asyncio.ensure_future(client.get_buttons())
+    await _run_pending_tasks()
+    client.connection_lost(None)
+    assert await buttons == []
+    mock_async_connect.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reads_are_coalesced():
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.get_running_loop())
+    transport = _attach_transport(client)
+
+    callers = [asyncio.ensure_future(client.get_buttons()) for _ in range(5)]
+    await _run_pending_tasks()
+    assert transport.written == [b"buttons\n"]
+
+    client.data_received(b'{"command": "buttons", "data": []}\n')
+    results = await asyncio.gather(*callers)
+    assert all(result is results[0] for result in results)
+
+    # A read after the reply arrived sends a new request
+    later = asyncio.ensure_future(client.get_buttons())
+    await _run_pending_tasks()
+    assert transport.written == [b"buttons\n", b"buttons\n"]
+    client.data_received(b'{"command": "buttons", "data": []}\n')
+    assert await later == []
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_read():
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.get_running_loop())
+    _attach_transport(client)
+
+    first = asyncio.ensure_future(client.get_server_info())
+    second = asyncio.ensure_future(client.get_server_info())
+    await _run_pending_tasks()
+    first.cancel()
+    await _run_pending_tasks()
+
+    client.data_received(b'{"command": "server", "data": {"version": "0.1.13"}}\n')
+    assert (await second).version == "0.1.13"
+
+
+@pytest.mark.asyncio
+async def test_cached_reads_invalidated_by_events():
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.get_running_loop(), cache_ttl={"buttons": 60.0})
+    transport = _attach_transport(client)
+
+    server_info = asyncio.ensure_future(client.get_server_info())
+    buttons = asyncio.ensure_future(client.get_buttons())
+    await _run_pending_tasks()
+    client.data_received(b'{"command": "server", "data": {"version": "0.1.12"}}\n{"command": "buttons", "data": []}\n')
+    await server_info
+    await buttons
+    await _run_pending_tasks()
+
+    assert (await client.get_server_info()).version == "0.1.12"
+    assert await client.get_buttons() == []
+    assert len(transport.written) == 2
+    assert client.cache.hits == {"server": 1, "buttons": 1}
+
+    client.data_received(b'{"event": "buttonDeleted", "button": "aa:bb:cc"}\n')
+    buttons = asyncio.ensure_future(client.get_buttons())
+    await _run_pending_tasks()
+    assert transport.written[-1] == b"buttons\n"
+    client.data_received(b'{"command": "buttons", "data": []}\n')
+    assert await buttons == []
+
+
+def _button_json(bdaddr, name):
+    return json.dumps(
+        {
+            "bdaddr": bdaddr,
+            "serialNumber": f"sn-{name}",
+            "color": "black",
+            "name": name,
+            "activeDisconnect": False,
+            "connected": True,
+            "ready": True,
+            "batteryStatus": 100,
+            "uuid": f"uuid-{name}",
+            "flicVersion": 2,
+            "firmwareVersion": 1,
+            "key": "key",
+            "passiveMode": False,
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_button_added_fetches_only_new_button():
+    from pyflichub.button import FlicButton
+
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.get_running_loop())
+    transport = _attach_transport(client)
+    client._hub_version = "0.1.13"
+    existing = FlicButton("aa:bb:cc", "sn", "black", "one", False, True, True, 100, "uuid", 2, 1, "key", False)
+    client.buttons = [existing]
+
+    client.data_received(b'{"event": "buttonAdded", "button": "dd:ee:ff"}\n')
+    await _run_pending_tasks()
+    request = json.loads(transport.written[-1])
+    assert request == {"command": "button", "request_id": request["request_id"], "bdaddrs": ["dd:ee:ff"]}
+
+    client.data_received(
+        f'{{"command": "button", "data": [{_button_json("dd:ee:ff", "two")}], "request_id": {request["request_id"]}}}\n'.encode()
+    )
+    await _run_pending_tasks()
+    assert [button.name for button in client.buttons] == ["one", "two"]
+    assert client.get_button("aa:bb:cc") is existing
+    assert client.get_button_by_uuid("uuid-two").bdaddr == "dd:ee:ff"
+
+
+@pytest.mark.asyncio
+async def test_button_details_falls_back_to_all_buttons():
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.get_running_loop())
+    transport = _attach_transport(client)
+
+    details = asyncio.ensure_future(client.get_button_details("dd:ee:ff"))
+    await _run_pending_tasks()
+    assert transport.written == [b"buttons\n"]
+
+    client.data_received(
+        f'{{"command": "buttons", "data": [{_button_json("aa:bb:cc", "one")}, {_button_json("dd:ee:ff", "two")}]}}\n'.encode()
+    )
+    assert [button.name for button in await details] == ["two"]
+    assert len(client.buttons) == 2
+
+
+@pytest.mark.asyncio
+async def test_sync_buttons_applies_diff():
+    from pyflichub.button import FlicButton
+
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.get_running_loop())
+    transport = _attach_transport(client)
+    client._hub_version = "0.1.13"
+    client.buttons = [
+        FlicButton("aa:bb:cc", "sn1", "black", "one", False, True, True, 100, "uuid1", 2, 1, "key", False),
+        FlicButton("11:22:33", "sn3", "black", "three", False, True, True, 100, "uuid3", 2, 1, "key", False),
+    ]
+
+    diff = asyncio.ensure_future(client.async_sync_buttons())
+    await _run_pending_tasks()
+    request = json.loads(transport.written[-1])
+    assert request["command"] == "buttonsDiff"
+    assert request["known"] == ["aa:bb:cc", "11:22:33"]
+
+    client.data_received(
+        f'{{"command": "buttonsDiff", "data": {{"added": [{_button_json("dd:ee:ff", "two")}],'
+        f' "removed": ["11:22:33"]}}, "request_id": {request["request_id"]}}}\n'.encode()
+    )
+    result = await diff
+    assert [button.bdaddr for button in result.added] == ["dd:ee:ff"]
+    assert result.removed == ["11:22:33"]
+    assert [button.name for button in client.buttons] == ["one", "two"]
+    assert client.get_button_by_serial_number("sn3") is None
+
+
+@pytest.mark.asyncio
+async def test_writes_are_batched_per_loop_iteration():
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.get_running_loop())
+    client._transport = MagicMock()
+
+    for brightness in (0.1, 0.2, 0.3):
+        client.send_virtual_device_update_state("Light", "Virtual Light", {"brightness": brightness})
+    client.play_ir("test_signal")
+    assert client.write_queue.depth == 4
+    client._transport.writelines.assert_not_called()
+
+    await asyncio.sleep(0)
+    client._transport.writelines.assert_called_once()
+    assert len(client._transport.writelines.call_args.args[0]) == 4
+    assert client.write_queue.depth == 0
+    assert client.write_queue.max_depth == 4
+    assert client.write_queue.lines_written == 4
+    assert client.write_queue.flushes == 1
+
+
+@pytest.mark.asyncio
+async def test_writes_held_while_transport_paused():
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.get_running_loop())
+    client._transport = MagicMock()
+
+    client.pause_writing()
+    client.play_ir("test_signal")
+    await asyncio.sleep(0)
+    client._transport.writelines.assert_not_called()
+    assert client.write_queue.depth == 1
+
+    client.resume_writing()
+    client._transport.writelines.assert_called_once()
+    assert client.write_queue.depth == 0
+
+
+@pytest.mark.asyncio
+async def test_virtual_device_updates_are_throttled():
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.get_running_loop(), virtual_device_max_rate=20)
+    transport = _attach_transport(client)
+
+    for brightness in (0.1, 0.2, 0.3):
+        client.send_virtual_device_update_state("Light", "Virtual Light", {"brightness": brightness})
+    await asyncio.sleep(0.08)
+
+    assert [json.loads(line)["values"]["brightness"] for line in transport.written] == [0.1, 0.3]
+
+
+def test_buttons_are_not_shared_between_clients():
+    from pyflichub.button import FlicButton
+
+    client1 = FlicHubTcpClient("127.0.0.1", 8124, asyncio.new_event_loop())
+    client2 = FlicHubTcpClient("127.0.0.2", 8124, asyncio.new_event_loop())
+    client1.buttons = [
+        FlicButton("aa:bb:cc", "sn", "black", "one", False, True, True, 100, "uuid", 2, 1, "key", False)
+    ]
+    assert client2.buttons == []
+    assert client2.get_button("aa:bb:cc") is None
+
+    client2.data_received(b'{"event": "buttonDeleted", "button": "aa:bb:cc"}\n')
+    assert len(client1.buttons) == 1
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_measures_round_trip_time():
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.get_running_loop(), heartbeat_interval=0.05)
+    transport = _attach_transport(client)
+    client._start_heartbeat()
+
+    await _run_pending_tasks()
+    assert transport.written == [b"ping\n"]
+    client.data_received(b'"pong"\n')
+    assert client.round_trip_times.count == 1
+    assert client._missed_pongs == 0
+
+    client._stop_heartbeat()
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_aborts_connection_after_missed_pongs():
+    client = FlicHubTcpClient(
+        "127.0.0.1", 8124, asyncio.get_running_loop(), heartbeat_interval=0.01, heartbeat_max_missed=2
+    )
+    client._transport = MagicMock()
+    client._start_heartbeat()
+
+    await asyncio.sleep(0.05)
+    client._transport.abort.assert_called_once()
+    assert client._heartbeat_task is None
+    assert client.round_trip_times.count == 0
+
+
+@pytest.mark.asyncio
+async def test_commands_sent_while_disconnected_are_replayed():
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.get_running_loop(), heartbeat_interval=None)
+    client._async_negotiate = MagicMock(return_value=asyncio.sleep(0))
+
+    client.play_ir("signal")
+    client.send_virtual_device_update_state("Light", "Virtual Light", {"brightness": 0.1})
+    client.send_virtual_device_update_state("Light", "Virtual Light", {"brightness": 0.2})
+    client.send_command("buttons")
+    assert len(client.offline_buffer) == 2
+
+    transport = FakeTransport()
+    client.connection_made(transport)
+    await _run_pending_tasks()
+    assert json.loads(transport.written[0]) == {"command": "play_ir", "signal_id": "signal"}
+    assert json.loads(transport.written[1])["values"] == {"brightness": 0.2}
+    assert len(transport.written) == 2
+
+
+@pytest.mark.asyncio
+async def test_unwritten_commands_are_buffered_on_connection_lost():
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.get_running_loop(), heartbeat_interval=None)
+    client._async_negotiate = MagicMock(side_effect=lambda: asyncio.sleep(0))
+    client._async_connect = MagicMock(side_effect=lambda: asyncio.sleep(0))
+    client.connection_made(FakeTransport())
+    await _run_pending_tasks()
+
+    # Held back by a full transport buffer when the connection drops
+    client.pause_writing()
+    client.play_ir("signal")
+    client.send_command("buttons")
+    client.connection_lost(None)
+    assert client.write_queue.depth == 0
+    assert len(client.offline_buffer) == 1
+
+    transport = FakeTransport()
+    client.connection_made(transport)
+    await _run_pending_tasks()
+    assert [json.loads(line) for line in transport.written] == [{"command": "play_ir", "signal_id": "signal"}]
+
+
+def test_traced_event_records_each_stage():
+    from pyflichub.tracing import EventTracer
+
+    spans = []
+    events_received = []
+    tracer = EventTracer(on_span=lambda name, start, end, attributes: spans.append((name, start, end, attributes)))
+    client = FlicHubTcpClient(
+        "127.0.0.1",
+        8124,
+        asyncio.new_event_loop(),
+        event_callback=lambda button, event: events_received.append(event),
+        tracer=tracer,
+    )
+
+    client.data_received(b'{"event": "buttonReady", "button": "aa:bb:cc", "hub_time": 1000}\n')
+    event = events_received[0]
+    assert event.hub_time == 1000
+    assert event.trace.received_at <= event.trace.parsed_at <= event.trace.dispatched_at <= event.trace.completed_at
+    assert tracer.transit_latency.count == 1
+    assert tracer.parse_latency.count == 1
+    assert tracer.dispatch_latency.count == 1
+    assert tracer.callback_duration.count == 1
+    assert [span[0] for span in spans] == [
+        "flichub.event.transit",
+        "flichub.event.parse",
+        "flichub.event.dispatch",
+        "flichub.event.callback",
+    ]
+    assert spans[1][3] == {"flichub.event": "buttonReady", "flichub.button": "aa:bb:cc"}
+
+
+def test_events_are_not_traced_without_tracer():
+    events_received = []
+    client = FlicHubTcpClient(
+        "127.0.0.1", 8124, asyncio.new_event_loop(), event_callback=lambda button, event: events_received.append(event)
+    )
+    client.data_received(b'{"event": "buttonReady", "button": "aa:bb:cc"}\n')
+    assert events_received[0].trace is None
+
+
+@pytest.mark.asyncio
+async def test_tracer_enables_event_timestamps_on_hub():
+    from pyflichub.tracing import EventTracer
+
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.get_running_loop(), tracer=EventTracer())
+    transport = _attach_transport(client)
+
+    negotiate = asyncio.ensure_future(client._async_negotiate())
+    await _run_pending_tasks()
+    client.data_received(b'{"command": "server", "data": {"version": "0.1.13"}}\n')
+    await _run_pending_tasks()
+    await _run_pending_tasks()
+    assert json.loads(transport.written[-1]) == {"command": "options", "event_timestamps": True, "request_id": 2}
+
+    client.data_received(b'{"command": "options", "data": {"event_timestamps": true}, "request_id": 2}\n')
+    await negotiate
+
+
+@pytest.mark.asyncio
+async def test_async_event_callback_does_not_block_reading():
+    events_received = []
+    release = asyncio.Event()
+
+    async def event_callback(button, event):
+        await release.wait()
+        events_received.append(event.event)
+
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.get_running_loop(), event_callback=event_callback)
+    assert client.event_dispatcher is not None
+
+    client.data_received(b'{"event": "buttonReady", "button": "aa:bb:cc"}\n{"event": "irResult", "action": "success"}\n')
+    await _run_pending_tasks()
+    assert events_received == []
+    assert client.event_dispatcher.pending == 1
+
+    release.set()
+    await client.event_dispatcher.join()
+    assert events_received == ["buttonReady", "irResult"]
+    client.event_dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_dispatch_queue_pauses_reading_from_transport():
+    from pyflichub.dispatcher import OverflowPolicy
+
+    client = FlicHubTcpClient(
+        "127.0.0.1",
+        8124,
+        asyncio.get_running_loop(),
+        event_callback=lambda button, event: None,
+        dispatch_workers=1,
+        dispatch_max_pending=2,
+        dispatch_overflow=OverflowPolicy.PAUSE_READING,
+    )
+    client._transport = MagicMock()
+
+    client.data_received(b'{"event": "buttonReady", "button": "aa:bb:cc"}\n' * 3)
+    client._transport.pause_reading.assert_called_once()
+
+    await client.event_dispatcher.join()
+    client._transport.resume_reading.assert_called_once()
+    client.event_dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_event_subscriptions():
+    from pyflichub.subscription import EventFilter
+
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.get_running_loop())
+    ready = client.events(filter=EventFilter.create(events=["buttonReady"]))
+    everything = client.events()
+
+    client.data_received(b'{"event": "buttonReady", "button": "aa:bb:cc"}\n{"event": "irResult", "action": "success"}\n')
+    assert [event.event for event in everything._queue] == ["buttonReady", "irResult"]
+
+    async with ready:
+        async for event in ready:
+            assert event.button == "aa:bb:cc"
+            break
+    assert client._subscriptions == [everything]
+
+    client.disconnect()
+    assert [event.event async for event in everything] == ["buttonReady", "irResult"]
+    assert client._subscriptions == []
+
+
+def test_register_event_handler():
+    events_received = []
+    client = FlicHubTcpClient(
+        "127.0.0.1",
+        8124,
+        asyncio.new_event_loop(),
+        event_callback=lambda button, event: events_received.append((button, event.event)),
+    )
+
+    # Unknown event types without a button are not passed on
+    client.data_received(b'{"event": "batteryLow", "button": "aa:bb:cc"}\n')
+    assert events_received == []
+
+    client.register_event_handler("batteryLow", lambda event: None, always_dispatch=True)
+    client.data_received(b'{"event": "batteryLow", "button": "aa:bb:cc"}\n')
+    assert events_received == [(None, "batteryLow")]
+
+    # Replacing a built-in handler
+    client.register_event_handler("irResult", lambda event: "button")
+    client.data_received(b'{"event": "irResult", "action": "success"}\n')
+    assert events_received[-1] == ("button", "irResult")
+    client.register_event_handler("irResult", lambda event: None)
+    client.data_received(b'{"event": "irResult", "action": "success"}\n')
+    assert len(events_received) == 2
+
+
+def test_subscriptions_are_indexed_by_event_type():
+    from pyflichub.subscription import EventFilter
+
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.new_event_loop())
+    ready = client.events(filter=EventFilter.create(events=["buttonReady", "irResult"]))
+    everything = client.events()
+    assert client._subscriptions_by_event == {"buttonReady": [ready], "irResult": [ready]}
+    assert client._subscriptions_to_all == [everything]
+
+    ready.close()
+    everything.close()
+    assert client._subscriptions_by_event == {}
+    assert client._subscriptions_to_all == []
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_on_virtual_clock():
+    from pyflichub.clock import VirtualClock
+
+    clock = VirtualClock()
+    client = FlicHubTcpClient(
+        "127.0.0.1", 8124, asyncio.get_running_loop(), heartbeat_interval=5.0, heartbeat_max_missed=2, clock=clock
+    )
+    transport = MagicMock()
+    client._transport = transport
+    client._start_heartbeat()
+    await asyncio.sleep(0)
+
+    await clock.run_for(1.0)
+    client.data_received(b'"pong"\n')
+    assert client.round_trip_times.sum == 1.0
+
+    # The pings at 5 and 10 seconds go unanswered
+    await clock.run_for(13.0)
+    transport.abort.assert_not_called()
+    await clock.run_for(1.0)
+    transport.abort.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_ignores_missed_pongs_while_reading_is_paused():
+    from pyflichub.clock import VirtualClock
+    from pyflichub.dispatcher import OverflowPolicy
+
+    clock = VirtualClock()
+    release = asyncio.Event()
+
+    async def event_callback(button, event):
+        await release.wait()
+
+    client = FlicHubTcpClient(
+        "127.0.0.1",
+        8124,
+        asyncio.get_running_loop(),
+        event_callback=event_callback,
+        dispatch_max_pending=1,
+        dispatch_overflow=OverflowPolicy.PAUSE_READING,
+        heartbeat_interval=5.0,
+        heartbeat_max_missed=2,
+        clock=clock,
+    )
+    transport = MagicMock()
+    client._transport = transport
+    client.data_received(b'{"event": "buttonReady", "button": "aa:bb:cc"}\n' * 3)
+    assert client.event_dispatcher.reading_paused
+
+    client._start_heartbeat()
+    await asyncio.sleep(0)
+    await clock.run_for(60.0)
+    transport.abort.assert_not_called()
+
+    client.connection_lost(None)
+    assert not client.event_dispatcher.reading_paused
+    release.set()
+    client.disconnect()
+    await _run_pending_tasks()
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from pyflichub.clock import MonotonicClock, VirtualClock
+
+
+def test_monotonic_clock_units():
+    clock = MonotonicClock()
+    first = clock.now_ns()
+    assert clock.now_ns() >= first
+    assert abs(clock.now() - clock.now_ms() / 1000) < 0.01
+
+
+@pytest.mark.asyncio
+async def test_virtual_clock_wakes_sleepers_in_order():
+    clock = VirtualClock(start_ns=1_000)
+    woken = []
+
+    async def sleeper(name, seconds):
+        await clock.sleep(seconds)
+        woken.append((name, clock.now_ns()))
+
+    tasks = [asyncio.ensure_future(sleeper("late", 2.0)), asyncio.ensure_future(sleeper("early", 1.0))]
+    await asyncio.sleep(0)
+
+    await clock.run_for(1.5)
+    assert woken == [("early", 1_000_001_000)]
+    assert clock.now_ns() == 1_500_001_000
+
+    clock.advance(1.0)
+    await asyncio.gather(*tasks)
+    # Advanced in one step, the late sleeper only sees the final time
+    assert woken[-1] == ("late", 2_500_001_000)
+
+
+@pytest.mark.asyncio
+async def test_run_for_lets_periodic_timers_run_at_their_time():
+    clock = VirtualClock()
+    ticks = []
+
+    async def timer():
+        while True:
+            await clock.sleep(0.25)
+            ticks.append(clock.now())
+
+    task = asyncio.ensure_future(timer())
+    await asyncio.sleep(0)
+    await clock.run_for(60)
+    task.cancel()
+
+    assert len(ticks) == 240
+    assert ticks[:3] == [0.25, 0.5, 0.75]
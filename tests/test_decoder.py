@@ -0,0 +1,41 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from pyflichub.client import FlicHubTcpClient
+from pyflichub.decoder import available_decoders, get_decoder
+
+LINE = b'{"event": "button", "button": "aa:bb:cc", "action": "single", "button_number": 0}'
+
+
+@pytest.mark.parametrize("name", available_decoders())
+def test_decoders(name):
+    decoder = get_decoder(name)
+    assert decoder.name == name
+    assert decoder.decode(LINE) == {"event": "button", "button": "aa:bb:cc", "action": "single", "button_number": 0}
+    with pytest.raises(Exception):
+        decoder.decode(b"invalid json")
+
+
+def test_default_decoder_is_fastest_available():
+    assert get_decoder().name == available_decoders()[0]
+    assert available_decoders()[-1] == "json"
+
+
+def test_unknown_decoder():
+    with pytest.raises(ValueError):
+        get_decoder("yaml")
+
+
+@pytest.mark.parametrize("name", available_decoders())
+def test_buttons_battery_timestamp(name):
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.new_event_loop(), json_decoder=name)
+
+    client.data_received(
+        b'{"command": "buttons", "data": [{"bdaddr": "aa:bb:cc", "serialNumber": "sn", "color": "black",'
+        b' "name": "one", "activeDisconnect": false, "connected": true, "ready": true, "batteryStatus": 100,'
+        b' "uuid": "uuid", "flicVersion": 2, "firmwareVersion": 1, "key": "key", "passiveMode": false,'
+        b' "batteryTimestamp": 1700000000000}]}\n'
+    )
+    assert client.get_button("aa:bb:cc").battery_timestamp == datetime.fromtimestamp(1700000000)
@@ -0,0 +1,125 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from pyflichub.dispatcher import EventDispatcher, OverflowPolicy
+
+
+@pytest.mark.asyncio
+async def test_sync_and_async_callbacks_are_run():
+    handled = []
+
+    async def callback(key, value):
+        await asyncio.sleep(0)
+        handled.append(value)
+
+    dispatcher = EventDispatcher(asyncio.get_running_loop(), callback)
+    assert dispatcher.submit("a", "a", 1)
+    assert dispatcher.submit("a", "a", 2)
+    await dispatcher.join()
+    assert handled == [1, 2]
+    assert dispatcher.dispatched == 2
+
+    sync_dispatcher = EventDispatcher(asyncio.get_running_loop(), lambda key, value: handled.append(value))
+    sync_dispatcher.submit("a", "a", 3)
+    await sync_dispatcher.join()
+    assert handled == [1, 2, 3]
+
+    dispatcher.stop()
+    sync_dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_events_with_the_same_key_stay_in_order():
+    handled = []
+
+    async def callback(key, value):
+        # Slow down the first button so the other one overtakes it
+        await asyncio.sleep(0.01 if key == "slow" else 0)
+        handled.append((key, value))
+
+    dispatcher = EventDispatcher(asyncio.get_running_loop(), callback, workers=4)
+    for value in range(3):
+        dispatcher.submit("slow", "slow", value)
+        dispatcher.submit("fast", "fast", value)
+    await dispatcher.join()
+
+    assert [value for key, value in handled if key == "slow"] == [0, 1, 2]
+    assert [value for key, value in handled if key == "fast"] == [0, 1, 2]
+    if hash("slow") % 4 != hash("fast") % 4:
+        assert handled[0][0] == "fast"
+    dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_errors_in_callbacks_dont_stop_the_worker():
+    handled = []
+
+    def callback(value):
+        if value == 1:
+            raise ValueError("boom")
+        handled.append(value)
+
+    dispatcher = EventDispatcher(asyncio.get_running_loop(), callback)
+    for value in range(3):
+        dispatcher.submit(None, value)
+    await dispatcher.join()
+
+    assert handled == [0, 2]
+    assert dispatcher.errors == 1
+    dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_and_drop_newest():
+    handled = []
+    loop = asyncio.get_running_loop()
+
+    oldest = EventDispatcher(loop, handled.append, max_pending=2, overflow=OverflowPolicy.DROP_OLDEST)
+    for value in range(4):
+        oldest.submit(None, value)
+    await oldest.join()
+    assert handled == [2, 3]
+    assert oldest.dropped == 2
+
+    handled.clear()
+    newest = EventDispatcher(loop, handled.append, max_pending=2, overflow=OverflowPolicy.DROP_NEWEST)
+    assert [newest.submit(None, value) for value in range(4)] == [True, True, False, False]
+    await newest.join()
+    assert handled == [0, 1]
+    assert newest.dropped == 2
+
+    oldest.stop()
+    newest.stop()
+
+
+@pytest.mark.asyncio
+async def test_pause_reading_until_queue_is_half_empty():
+    pause_reading = MagicMock()
+    resume_reading = MagicMock()
+    handled = []
+    dispatcher = EventDispatcher(
+        asyncio.get_running_loop(),
+        handled.append,
+        max_pending=4,
+        overflow=OverflowPolicy.PAUSE_READING,
+        pause_reading=pause_reading,
+        resume_reading=resume_reading,
+    )
+    for value in range(6):
+        dispatcher.submit(None, value)
+    pause_reading.assert_called_once()
+    resume_reading.assert_not_called()
+    assert dispatcher.pending == 6
+
+    await dispatcher.join()
+    assert handled == list(range(6))
+    assert dispatcher.dropped == 0
+    resume_reading.assert_called_once()
+    dispatcher.stop()
+
+
+def test_needs_a_worker():
+    with pytest.raises(ValueError):
+        EventDispatcher(MagicMock(), print, workers=0)
@@ -0,0 +1,20 @@
+import dataclasses
+
+import pytest
+
+from pyflichub.event import Event
+from pyflichub.tracing import EventTrace
+
+
+def test_event_is_frozen_and_slotted():
+    event = Event("button", button="aa:bb:cc", action="single")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        event.action = "double"
+    assert not hasattr(event, "__dict__")
+
+
+def test_event_equality_and_repr_ignore_trace():
+    traced = Event("button", button="aa:bb:cc", action="single", trace=EventTrace(1.0, 2.0))
+    assert traced == Event("button", button="aa:bb:cc", action="single")
+    assert traced != Event("button", button="aa:bb:cc", action="double")
+    assert "trace" not in repr(traced)
@@ -0,0 +1,19 @@
+from pyflichub.histogram import Histogram
+
+
+def test_histogram():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    assert histogram.average is None
+    assert histogram.quantile(0.5) is None
+
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    assert histogram.count == 4
+    assert histogram.sum == 2.65
+    assert histogram.min == 0.05
+    assert histogram.max == 2.0
+    assert histogram.cumulative_counts() == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1.0
+    assert histogram.quantile(1.0) == 2.0
@@ -0,0 +1,31 @@
+import humps
+
+from pyflichub.keys import KEY_MAP, decamelize, decamelize_key, decamelize_keys
+
+
+def test_key_map_matches_humps():
+    for camel_key, snake_key in KEY_MAP.items():
+        assert humps.decamelize(camel_key) == snake_key
+
+
+def test_unknown_key_falls_back_to_humps():
+    assert decamelize_key("someNewKey") == "some_new_key"
+
+
+def test_decamelize_keys_is_flat():
+    assert decamelize_keys({"serialNumber": "sn", "wifiState": {"someState": 1}}) == {
+        "serial_number": "sn",
+        "wifi_state": {"someState": 1},
+    }
+
+
+def test_decamelize_matches_humps():
+    network = {
+        "dhcp": {
+            "wifi": {"connected": True, "ip": "192.168.1.2", "mac": "aa:bb:cc:dd:ee:ff"},
+            "ethernet": None,
+        },
+        "wifiState": {"state": "connected", "ssid": [115, 115, 105, 100]},
+        "extraList": [{"innerKey": 1}],
+    }
+    assert decamelize(network) == humps.decamelize(network)
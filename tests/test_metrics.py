@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from pyflichub.client import FlicHubTcpClient
+from pyflichub.metrics import InMemoryCollector, MetricsCollector, to_prometheus_text
+
+
+def test_null_collector_accepts_everything():
+    collector = MetricsCollector()
+    collector.inc("events_received_total")
+    collector.observe("command_latency_seconds", 0.1)
+    collector.set("connected", 1)
+
+
+def test_prometheus_text():
+    collector = InMemoryCollector(buckets=(0.1, 1.0))
+    collector.inc("events_received_total", labels=(("hub", "hub1"), ("event", "button")))
+    collector.inc("events_received_total", 2, labels=(("hub", "hub1"), ("event", "button")))
+    collector.set("connected", 1, labels=(("hub", "hub1"),))
+    collector.observe("command_latency_seconds", 0.05, labels=(("command", "buttons"),))
+    collector.observe("command_latency_seconds", 0.5, labels=(("command", "buttons"),))
+
+    assert to_prometheus_text(collector) == (
+        "# TYPE flichub_events_received_total counter\n"
+        'flichub_events_received_total{hub="hub1",event="button"} 3\n'
+        "# TYPE flichub_connected gauge\n"
+        'flichub_connected{hub="hub1"} 1\n'
+        "# TYPE flichub_command_latency_seconds histogram\n"
+        'flichub_command_latency_seconds_bucket{command="buttons",le="0.1"} 1\n'
+        'flichub_command_latency_seconds_bucket{command="buttons",le="1"} 2\n'
+        'flichub_command_latency_seconds_bucket{command="buttons",le="+Inf"} 2\n'
+        'flichub_command_latency_seconds_sum{command="buttons"} 0.55\n'
+        'flichub_command_latency_seconds_count{command="buttons"} 2\n'
+    )
+
+
+def test_client_counts_received_data():
+    collector = InMemoryCollector()
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.new_event_loop(), metrics=collector)
+
+    client.data_received(
+        b'{"event": "buttonConnected", "button": "aa:bb:cc"}\n'
+        b'{"event": "button", "button": "aa:bb:cc", "action": "down"}\n'
+        b"invalid json\n"
+    )
+    assert collector.counter("lines_received_total") == 3
+    assert collector.counter("bytes_received_total") > 0
+    assert collector.counter("events_received_total") == 2
+    assert collector.counter("events_received_total", event="button") == 1
+    assert collector.counter("decode_errors_total", hub="127.0.0.1:8124") == 1
+
+
+@pytest.mark.asyncio
+async def test_client_measures_command_latency():
+    collector = InMemoryCollector()
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.get_running_loop(), metrics=collector)
+    client._transport = _NullTransport()
+
+    buttons = asyncio.ensure_future(client.get_buttons())
+    for _ in range(3):
+        await asyncio.sleep(0)
+    client.data_received(b'{"command": "buttons", "data": []}\n')
+    await buttons
+
+    assert collector.histogram("command_latency_seconds", command="buttons").count == 1
+    assert collector.counter("commands_received_total", command="buttons") == 1
+    assert collector.counter("bytes_sent_total") == len(b"buttons\n")
+
+
+def test_bytes_are_counted_when_written():
+    collector = InMemoryCollector()
+    client = FlicHubTcpClient("127.0.0.1", 8124, asyncio.new_event_loop(), metrics=collector)
+
+    # Buffered while offline, not sent yet
+    client.play_ir("signal")
+    assert collector.counter("bytes_sent_total") == 0
+
+    client._transport = _NullTransport()
+    for line in client.offline_buffer.drain():
+        client.write_queue.put(line)
+    client.write_queue.flush()
+    assert collector.counter("bytes_sent_total") == client.write_queue.bytes_written > 0
+
+
+class _NullTransport:
+    def writelines(self, lines):
+        pass
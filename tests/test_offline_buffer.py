@@ -0,0 +1,44 @@
+from pyflichub.offline_buffer import BufferPolicy, BufferRule, OfflineBuffer
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_policies():
+    buffer = OfflineBuffer(FakeTime(), {"latest": BufferRule(BufferPolicy.KEEP_LATEST)})
+
+    assert buffer.put("buttons", b"buttons\n") is False
+    assert buffer.put("play_ir", b"ir1\n") is True
+    assert buffer.put("latest", b"light1\n", key="light") is True
+    assert buffer.put("latest", b"volume1\n", key="volume") is True
+    assert buffer.put("play_ir", b"ir2\n") is True
+    assert buffer.put("latest", b"light2\n", key="light") is True
+
+    assert buffer.drain() == [b"ir1\n", b"volume1\n", b"ir2\n", b"light2\n"]
+    assert len(buffer) == 0
+    assert buffer.lines_replaced == 1
+    assert buffer.lines_dropped == 1
+
+
+def test_expired_lines_are_dropped():
+    time = FakeTime()
+    buffer = OfflineBuffer(time, {"cmd": BufferRule(BufferPolicy.KEEP_ALL, ttl=5.0)})
+
+    buffer.put("cmd", b"old\n")
+    time.now = 4.0
+    buffer.put("cmd", b"new\n")
+    time.now = 6.0
+    assert buffer.drain() == [b"new\n"]
+    assert buffer.lines_expired == 1
+
+
+def test_buffer_is_bounded():
+    buffer = OfflineBuffer(FakeTime(), {"cmd": BufferRule(BufferPolicy.KEEP_ALL)}, max_lines=2)
+    for index in range(3):
+        buffer.put("cmd", f"{index}\n".encode())
+    assert buffer.drain() == [b"1\n", b"2\n"]
@@ -0,0 +1,103 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from pyflichub.button import FlicButton
+from pyflichub.pool import FlicHubPool
+
+
+def _button(bdaddr, name):
+    return FlicButton(bdaddr, "sn", "black", name, False, True, True, 100, f"uuid-{name}", 2, 1, "key", False)
+
+
+class ReplyingTransport:
+    """Answers buttons requests with an empty button list on the next loop iteration."""
+
+    def __init__(self, loop, client, stats):
+        self._loop = loop
+        self._client = client
+        self._stats = stats
+
+    def writelines(self, lines):
+        for _ in lines:
+            self._stats["in_flight"] += 1
+            self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._stats["in_flight"])
+            self._loop.call_soon(self._reply)
+
+    def _reply(self):
+        self._stats["in_flight"] -= 1
+        self._client.data_received(b'{"command": "buttons", "data": []}\n')
+
+    def close(self):
+        pass
+
+
+def test_events_are_routed_with_hub_id():
+    events = []
+    pool = FlicHubPool(asyncio.new_event_loop(), event_callback=lambda *args: events.append(args))
+    kitchen = pool.add_hub("kitchen", "192.168.1.10")
+    hall = pool.add_hub("hall", "192.168.1.11")
+    kitchen.buttons = [_button("aa:bb:cc", "kitchen")]
+    hall.buttons = [_button("dd:ee:ff", "hall")]
+
+    hall.data_received(b'{"event": "button", "button": "dd:ee:ff", "action": "single"}\n')
+    kitchen.data_received(b'{"event": "button", "button": "aa:bb:cc", "action": "hold"}\n')
+
+    assert [(hub_id, button.name, event.action) for hub_id, button, event in events] == [
+        ("hall", "hall", "single"),
+        ("kitchen", "kitchen", "hold"),
+    ]
+    assert pool.get_button("dd:ee:ff")[0] == "hall"
+    assert pool.get_button("00:00:00") == (None, None)
+
+
+@pytest.mark.asyncio
+async def test_async_event_callback():
+    events = []
+
+    async def event_callback(hub_id, button, event):
+        await asyncio.sleep(0)
+        events.append((hub_id, event.event))
+
+    pool = FlicHubPool(asyncio.get_running_loop(), event_callback=event_callback)
+    kitchen = pool.add_hub("kitchen", "192.168.1.10")
+    assert kitchen.event_dispatcher is not None
+
+    kitchen.data_received(b'{"event": "buttonReady", "button": "aa:bb:cc"}\n')
+    await kitchen.event_dispatcher.join()
+    assert events == [("kitchen", "buttonReady")]
+    kitchen.event_dispatcher.stop()
+
+
+def test_add_hub_twice():
+    pool = FlicHubPool(asyncio.new_event_loop())
+    pool.add_hub("kitchen", "192.168.1.10")
+    with pytest.raises(ValueError):
+        pool.add_hub("kitchen", "192.168.1.12")
+
+
+@pytest.mark.asyncio
+async def test_gather_buttons_bounded_concurrency():
+    loop = asyncio.get_running_loop()
+    stats = {"in_flight": 0, "max_in_flight": 0}
+    pool = FlicHubPool(loop, max_concurrency=3)
+    for index in range(10):
+        client = pool.add_hub(f"hub{index}", f"192.168.1.{index}")
+        client._transport = ReplyingTransport(loop, client, stats)
+    pool.add_hub("offline", "192.168.1.100")
+
+    buttons = await pool.gather_buttons()
+    assert sorted(buttons) == [f"hub{index}" for index in range(10)]
+    assert all(result == [] for result in buttons.values())
+    assert stats["max_in_flight"] <= 3
+
+
+def test_remove_hub_disconnects():
+    pool = FlicHubPool(asyncio.new_event_loop())
+    client = pool.add_hub("kitchen", "192.168.1.10")
+    client._transport = MagicMock()
+
+    pool.remove_hub("kitchen")
+    client._transport.close.assert_called_once()
+    assert pool.hub_ids == []
@@ -0,0 +1,64 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from pyflichub.client import FlicHubTcpClient
+from pyflichub.reconnect import ReconnectPolicy, ReconnectStats
+
+
+def test_policy_backoff():
+    policy = ReconnectPolicy(base_delay=1.0, max_delay=5.0, jitter=0.0)
+    assert [policy.next_delay() for _ in range(6)] == [0.0, 1.0, 2.0, 4.0, 5.0, 5.0]
+
+    policy.reset()
+    assert policy.attempt == 0
+    assert policy.next_delay() == 0.0
+
+
+def test_policy_long_outage():
+    policy = ReconnectPolicy(jitter=0.0)
+    delays = [policy.next_delay() for _ in range(5000)]
+    assert delays[-1] == policy.max_delay
+    assert policy.attempt == 5000
+
+
+def test_policy_jitter():
+    policy = ReconnectPolicy(base_delay=2.0, jitter=0.5, random_func=lambda: 1.0)
+    policy.next_delay()
+    assert policy.next_delay() == 1.0
+
+    policy = ReconnectPolicy(base_delay=2.0, jitter=0.5, random_func=lambda: 0.0)
+    policy.next_delay()
+    assert policy.next_delay() == 2.0
+
+
+def test_stats():
+    stats = ReconnectStats()
+    assert stats.average_latency is None
+    stats.record_reconnect(1.0)
+    stats.record_reconnect(3.0)
+    assert stats.reconnects == 2
+    assert stats.last_latency == 3.0
+    assert stats.max_latency == 3.0
+    assert stats.average_latency == 2.0
+
+
+@pytest.mark.asyncio
+async def test_reconnect_with_backoff(monkeypatch):
+    loop = asyncio.get_running_loop()
+    client = FlicHubTcpClient(
+        "127.0.0.1", 8124, loop, reconnect_policy=ReconnectPolicy(base_delay=0.01, max_delay=0.02, jitter=0.0)
+    )
+    create_connection = AsyncMock(side_effect=[OSError(), OSError(), (None, client)])
+    monkeypatch.setattr(loop, "create_connection", create_connection)
+
+    client._connecting = True
+    client._disconnected_at = loop.time()
+    await client._async_connect()
+
+    assert create_connection.await_count == 3
+    assert client.reconnect_stats.failed_attempts == 2
+    assert client.reconnect_stats.reconnects == 1
+    assert 0.03 <= client.reconnect_stats.last_latency < 1.0
+    assert client._reconnect_policy.attempt == 0
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from pyflichub.event import Event
+from pyflichub.subscription import EventFilter, EventSubscription
+
+
+def test_filter_matches_type_button_and_action():
+    event = Event("button", button="aa:bb:cc", action="single")
+    assert EventFilter().matches(event)
+    assert EventFilter.create(events=["button"], bdaddrs=["aa:bb:cc"], actions=["single", "double"]).matches(event)
+    assert not EventFilter.create(events=["buttonReady"]).matches(event)
+    assert not EventFilter.create(bdaddrs=["dd:ee:ff"]).matches(event)
+    assert not EventFilter.create(actions=["hold"]).matches(event)
+
+
+def test_put_only_queues_matching_events():
+    subscription = EventSubscription(EventFilter.create(events=["button"]))
+    assert subscription.put(Event("button", button="aa:bb:cc"))
+    assert not subscription.put(Event("buttonReady", button="aa:bb:cc"))
+    assert len(subscription) == 1
+    assert subscription.received == 1
+
+
+def test_full_queue_drops_oldest_event():
+    subscription = EventSubscription(max_pending=2)
+    for action in ["down", "up", "click"]:
+        subscription.put(Event("button", button="aa:bb:cc", action=action))
+    assert [event.action for event in subscription._queue] == ["up", "click"]
+    assert subscription.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_iteration_ends_after_close():
+    closed = []
+    subscription = EventSubscription(on_close=closed.append)
+
+    async def consume():
+        return [event.action async for event in subscription]
+
+    consumer = asyncio.ensure_future(consume())
+    subscription.put(Event("button", action="down"))
+    await asyncio.sleep(0)
+    subscription.put(Event("button", action="up"))
+    subscription.close()
+    subscription.close()
+
+    assert await consumer == ["down", "up"]
+    assert closed == [subscription]
+    assert not subscription.put(Event("button", action="click"))
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from pyflichub.clock import VirtualClock
+from pyflichub.throttle import LatestValueThrottle
+
+
+@pytest.mark.asyncio
+async def test_only_latest_value_is_sent():
+    sent = []
+    throttle = LatestValueThrottle(asyncio.get_running_loop(), lambda key, value: sent.append((key, value)), 0.05)
+
+    throttle.submit("light", 1)
+    throttle.submit("light", 2)
+    throttle.submit("light", 3)
+    throttle.submit("volume", 10)
+    assert sent == [("light", 1), ("volume", 10)]
+    assert throttle.pending == 1
+
+    await asyncio.sleep(0.08)
+    assert sent == [("light", 1), ("volume", 10), ("light", 3)]
+    assert throttle.sent == 3
+    assert throttle.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_flush_sends_pending_values():
+    sent = []
+    throttle = LatestValueThrottle(asyncio.get_running_loop(), lambda key, value: sent.append((key, value)), 10.0)
+
+    throttle.submit("light", 1)
+    throttle.submit("light", 2)
+    throttle.flush()
+    assert sent == [("light", 1), ("light", 2)]
+    assert throttle.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_cancel_drops_pending_values():
+    sent = []
+    throttle = LatestValueThrottle(asyncio.get_running_loop(), lambda key, value: sent.append((key, value)), 0.01)
+
+    throttle.submit("light", 1)
+    throttle.submit("light", 2)
+    throttle.cancel()
+    await asyncio.sleep(0.02)
+    assert sent == [("light", 1)]
+
+
+@pytest.mark.asyncio
+async def test_interval_follows_the_clock():
+    clock = VirtualClock()
+    sent = []
+    throttle = LatestValueThrottle(
+        asyncio.get_running_loop(), lambda key, value: sent.append((key, value, clock.now())), 60.0, clock
+    )
+
+    throttle.submit("light", 1)
+    clock.advance(10.0)
+    throttle.submit("light", 2)
+    await asyncio.sleep(0)
+
+    await clock.run_for(49.0)
+    assert sent == [("light", 1, 0.0)]
+    await clock.run_for(1.0)
+    assert sent == [("light", 1, 0.0), ("light", 2, 60.0)]
@@ -0,0 +1,80 @@
+import asyncio
+
+from pyflichub.client import FlicHubTcpClient
+from pyflichub.clock import VirtualClock
+from pyflichub.event import Event
+from pyflichub.tracing import EventTrace, EventTracer
+
+
+def _trace(parsed=None, dispatched=None, completed=None):
+    trace = EventTrace(10.0, 1000.0)
+    trace.parsed_at = parsed
+    trace.dispatched_at = dispatched
+    trace.completed_at = completed
+    return trace
+
+
+def test_finish_observes_stage_latencies():
+    tracer = EventTracer()
+    event = Event("button", button="aa:bb:cc", action="click", hub_time=999_950)
+    tracer.finish(event, _trace(10.001, 10.003, 10.013))
+
+    assert round(tracer.transit_latency.sum, 6) == 0.05
+    assert round(tracer.parse_latency.sum, 6) == 0.001
+    assert round(tracer.dispatch_latency.sum, 6) == 0.002
+    assert round(tracer.callback_duration.sum, 6) == 0.01
+
+
+def test_finish_skips_stages_that_were_not_reached():
+    tracer = EventTracer()
+    tracer.finish(Event("buttonReady", button="aa:bb:cc"), _trace(10.001))
+
+    assert tracer.transit_latency.count == 0
+    assert tracer.parse_latency.count == 1
+    assert tracer.dispatch_latency.count == 0
+    assert tracer.callback_duration.count == 0
+
+
+def test_transit_latency_is_never_negative():
+    tracer = EventTracer()
+    # The clock of the hub is ahead of ours
+    tracer.finish(Event("buttonReady", hub_time=1_000_500), _trace())
+    assert tracer.transit_latency.sum == 0.0
+
+
+def test_spans_use_wall_clock_nanoseconds():
+    spans = []
+    tracer = EventTracer(on_span=lambda *span: spans.append(span))
+    event = Event("button", button="aa:bb:cc", action="click", hub_time=999_950)
+    tracer.finish(event, _trace(10.5, 10.5, 11.0))
+
+    assert spans == [
+        ("flichub.event.transit", 999_950_000_000, 1_000_000_000_000, {
+            "flichub.event": "button", "flichub.button": "aa:bb:cc", "flichub.action": "click"
+        }),
+        ("flichub.event.parse", 1_000_000_000_000, 1_000_500_000_000, spans[0][3]),
+        ("flichub.event.dispatch", 1_000_500_000_000, 1_000_500_000_000, spans[0][3]),
+        ("flichub.event.callback", 1_000_500_000_000, 1_001_000_000_000, spans[0][3]),
+    ]
+
+
+def test_stages_are_timed_with_the_given_clock():
+    clock = VirtualClock(start_ns=5_000_000_000)
+    tracer = EventTracer(clock=clock)
+    trace = tracer.start()
+    clock.advance(0.25)
+
+    assert trace.received_at == 5.0
+    assert tracer.now() == 5.25
+
+
+def test_client_shares_its_clock_with_the_tracer():
+    clock = VirtualClock()
+    tracer = EventTracer()
+    FlicHubTcpClient("127.0.0.1", 8124, asyncio.new_event_loop(), clock=clock, tracer=tracer)
+    assert tracer.clock is clock
+
+    own_clock = VirtualClock()
+    tracer = EventTracer(clock=own_clock)
+    FlicHubTcpClient("127.0.0.1", 8124, asyncio.new_event_loop(), clock=clock, tracer=tracer)
+    assert tracer.clock is own_clock
@@ -72,3 +72,52 @@ async def test_controller_tick():
     assert len(values) > 0
     assert ctrl.get_actual_out_pct() > 50
     assert values[-1] == ctrl.get_actual_out_pct()
+
+
+def test_update_raw_fast_matches_update_raw():
+    from pyflichub.twist_controller import NOTE_DETENT, NOTES
+
+    slow = RateDetentController({"easeConfirmMs": 40})
+    fast = RateDetentController({"easeConfirmMs": 40})
+    slow.stop()
+    fast.stop()
+
+    positions = [50, 52, 60, 80, 95, 90, 85, 70, 56, 40, 20, 48, 50, "x"]
+    for now, raw in enumerate(positions):
+        expected = slow.update_raw(raw, now_ms=now * 30)
+        result = fast.update_raw_fast(raw, now_ms=now * 30)
+        if expected is None:
+            assert result is None
+            continue
+        assert (result.intent_changed, result.dir, result.speed, result.fine_mode, NOTES[result.note]) == (
+            expected["intentChanged"], expected["dir"], expected["speed"], expected["fineMode"], expected["note"]
+        )
+
+    # The result object is reused
+    assert fast.update_raw_fast(60, now_ms=1000) is fast.update_raw_fast(61, now_ms=1010)
+    assert fast.update_raw_fast(90, now_ms=1020).note == NOTE_DETENT
+    assert fast._result.note_name == "detent"
+
+
+@pytest.mark.asyncio
+async def test_controller_on_virtual_clock():
+    from pyflichub.clock import VirtualClock
+
+    clock = VirtualClock()
+    values = []
+    ctrl = RateDetentController(
+        {"tickMs": 100, "initialOutPct": 50, "timeoutMs": 1000}, on_change_callback=values.append, clock=clock
+    )
+
+    ctrl.update_raw(50)
+    ctrl.update_raw(60)
+    await asyncio.sleep(0)
+
+    # Half a second of ticks at speed 1, then the timeout stops the controller after a second without input
+    await clock.run_for(0.5)
+    assert values == [51, 52, 53, 54, 55]
+    await clock.run_for(120)
+    assert ctrl.current_dir == 0
+    assert ctrl.get_actual_out_pct() == 60
+
+    ctrl.stop()
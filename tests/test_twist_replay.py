@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from pyflichub import twist_replay
+from pyflichub.twist_controller import RateDetentController
+from pyflichub.twist_replay import replay
+
+
+def _recorded_trace(count=2000, seed=1):
+    """A Twist being turned back and forth at varying speeds, with pauses."""
+    rng = random.Random(seed)
+    samples = []
+    now = 1_700_000_000_000.0
+    position = 50.0
+    for _ in range(count):
+        now += rng.choice([10, 20, 50, 120, 400, 900])
+        position = min(100.0, max(0.0, position + rng.uniform(-12, 12)))
+        samples.append((now, round(position, 1)))
+    return samples
+
+
+def _stream(cfg, samples):
+    """Feed the samples one by one like a running controller would see them."""
+    controller = RateDetentController(cfg)
+    controller.stop()
+    first = samples[0][0]
+    ticks = 0
+    results = []
+    for now, raw in samples:
+        while first + (ticks + 1) * controller.tick_ms <= now:
+            ticks += 1
+            controller._tick(first + ticks * controller.tick_ms)
+        state = controller.update_raw(raw, now_ms=now)
+        results.append(
+            (state["dir"], state["speed"], state["fineMode"], state["intentChanged"], state["note"],
+             controller.get_actual_out_pct())
+        )
+    return results
+
+
+def _rows(result):
+    return [
+        (int(result.dir[i]), int(result.speed[i]), bool(result.fine_mode[i]), bool(result.intent_changed[i]),
+         result.note[i], int(result.out_pct[i]))
+        for i in range(len(result))
+    ]
+
+
+CONFIGS = [
+    {},
+    {"tickMs": 50, "initialOutPct": 50, "tier1MaxOff": 15, "deadbandEnter": 3, "easeConfirmMs": 100},
+    {"tickMs": 100, "initialOutPct": 120, "maxOutPct": 100, "timeoutMs": 0, "easeConfirmMs": 400},
+]
+
+
+@pytest.mark.parametrize("cfg", CONFIGS)
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_replay_matches_streaming(cfg, use_numpy, monkeypatch):
+    if use_numpy and twist_replay.np is None:
+        pytest.skip("NumPy is not installed")
+    if not use_numpy:
+        monkeypatch.setattr(twist_replay, "np", None)
+
+    samples = _recorded_trace()
+    controller = RateDetentController(cfg)
+    result = replay(controller, samples)
+
+    assert _rows(result) == _stream(cfg, samples)
+    assert controller._timer_task is None
+
+
+def test_replay_of_no_samples():
+    assert len(replay(RateDetentController(), [])) == 0
+
+
+def test_replay_rejects_unordered_samples():
+    with pytest.raises(ValueError):
+        replay(RateDetentController(), [(100, 50), (50, 60)])
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from pyflichub.clock import VirtualClock
+from pyflichub.twist_controller import RateDetentController
+from pyflichub.twist_scheduler import TickScheduler
+
+
+def _moving(controller):
+    controller.update_raw(50)
+    controller.update_raw(65)
+
+
+@pytest.mark.asyncio
+async def test_controllers_share_one_timer():
+    scheduler = TickScheduler()
+    values = {index: [] for index in range(3)}
+    controllers = [
+        RateDetentController(
+            {"tickMs": 10, "initialOutPct": 50, "timeoutMs": 0},
+            on_change_callback=values[index].append,
+            scheduler=scheduler,
+        )
+        for index in range(3)
+    ]
+
+    # Controllers that don't move are not scheduled
+    for controller in controllers:
+        controller.update_raw(50)
+    assert scheduler.active == 0
+
+    for controller in controllers:
+        controller.update_raw(65)
+    assert scheduler.active == 3
+    assert all(controller._timer_task is None for controller in controllers)
+
+    await asyncio.sleep(0.055)
+    assert all(len(values[index]) >= 3 for index in range(3))
+    assert all(values[index][-1] == controllers[index].get_actual_out_pct() > 50 for index in range(3))
+
+    for controller in controllers:
+        controller.stop()
+    assert scheduler.active == 0
+    assert scheduler._timer is None
+
+
+@pytest.mark.asyncio
+async def test_idle_controller_is_parked_and_woken_up():
+    scheduler = TickScheduler()
+    controller = RateDetentController({"tickMs": 10, "initialOutPct": 50, "timeoutMs": 25}, scheduler=scheduler)
+
+    _moving(controller)
+    assert scheduler.active == 1
+
+    # The timeout neutralizes the controller, after which it is parked
+    await asyncio.sleep(0.06)
+    assert controller.current_dir == 0
+    assert scheduler.active == 0
+    assert scheduler.parks == 1
+    ticks = scheduler.ticks
+
+    await asyncio.sleep(0.03)
+    assert scheduler.ticks == ticks
+
+    controller.update_raw(80)
+    assert scheduler.active == 1
+    assert scheduler.wakeups == 2
+    controller.stop()
+
+
+@pytest.mark.asyncio
+async def test_removed_controller_is_not_ticked():
+    scheduler = TickScheduler()
+    ticked = []
+    controller = RateDetentController({"tickMs": 10, "initialOutPct": 50}, scheduler=scheduler)
+    controller._tick = lambda: ticked.append(True)
+
+    _moving(controller)
+    scheduler.remove(controller)
+    await asyncio.sleep(0.03)
+    assert ticked == []
+
+
+@pytest.mark.asyncio
+async def test_virtual_clock_runs_controllers_faster_than_real_time():
+    clock = VirtualClock()
+    scheduler = TickScheduler(clock=clock)
+    controllers = [
+        RateDetentController({"tickMs": 100, "initialOutPct": 0, "timeoutMs": 60_000}, scheduler=scheduler)
+        for _ in range(3)
+    ]
+    assert all(controller._clock is clock for controller in controllers)
+
+    for controller in controllers:
+        _moving(controller)
+    await asyncio.sleep(0)
+
+    # One tier 1 step per tick until the timeout neutralizes the controllers after a minute
+    await clock.run_for(120.0)
+    assert all(controller.get_actual_out_pct() == 100 for controller in controllers)
+    assert all(controller.current_dir == 0 for controller in controllers)
+    assert scheduler.active == 0
+    assert scheduler._timer is None
+
+
+def test_controller_and_scheduler_share_a_clock():
+    with pytest.raises(ValueError):
+        RateDetentController(scheduler=TickScheduler(clock=VirtualClock()), clock=VirtualClock())
+
+
+def test_scheduler_needs_an_event_loop():
+    controller = RateDetentController({"initialOutPct": 50}, scheduler=TickScheduler())
+    controller.update_raw(50)
+    with pytest.raises(RuntimeError):
+        controller.update_raw(65)
@@ -0,0 +1,41 @@
+import asyncio
+from unittest.mock import MagicMock
+
+from pyflichub.writer import OutboundQueue
+
+
+def test_drops_oldest_line_when_full():
+    transport = MagicMock()
+    queue = OutboundQueue(asyncio.new_event_loop(), lambda: transport, max_pending_lines=2)
+
+    queue.pause()
+    queue.put(b"1\n")
+    queue.put(b"2\n")
+    queue.put(b"3\n")
+    assert queue.depth == 2
+    assert queue.lines_dropped == 1
+
+    queue.resume()
+    transport.writelines.assert_called_once_with([b"2\n", b"3\n"])
+    assert queue.bytes_written == 4
+
+
+def test_flush_without_transport_keeps_lines():
+    queue = OutboundQueue(asyncio.new_event_loop(), lambda: None)
+    queue.put(b"1\n")
+    queue.flush()
+    assert queue.depth == 1
+
+
+def test_take_unwritten_returns_tagged_lines():
+    queue = OutboundQueue(asyncio.new_event_loop(), lambda: None)
+    queue.pause()
+    queue.put(b"1\n", "play_ir")
+    queue.put(b"2\n", "virtualDeviceUpdateState", key="light")
+    queue.put(b"3\n")
+
+    assert queue.take_unwritten() == [
+        (b"1\n", "play_ir", None), (b"2\n", "virtualDeviceUpdateState", "light"), (b"3\n", None, None)
+    ]
+    assert queue.depth == 0
+    assert not queue.paused